@@ -2,21 +2,33 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 
 from langgraph.types import Command, interrupt
-from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langchain.chat_models import init_chat_model
-
-from IPython.display import Image, display
+from langchain.embeddings import init_embeddings
+from langchain_core.runnables import RunnableLambda
 
 from pydantic import BaseModel, Field
-from typing import Literal
-
-from dotenv import load_dotenv
-load_dotenv()
+from typing import Literal, Annotated, NamedTuple
+import operator
 
 import os
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+import sqlite3
+
+# Only read .env when the environment wasn't already populated (e.g. by systemd/docker)
+if not os.getenv("OPENAI_API_KEY"):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 import random
+from string import Template
+from functools import lru_cache
+import logging
+import orjson
+import httpx
+
+from agent_graph.llm_cache import LLMResponseCache, SemanticCache, normalize_message, make_cache_key
+
+logger = logging.getLogger(__name__)
 
 # Slack assistant triage prompt 
 slack_triage_system_prompt = """
@@ -42,13 +54,24 @@ Classify the below Slack message into one of these categories.
 </ Rules >
 """
 
-# Slack assistant triage user prompt 
-slack_triage_user_prompt = """
+# Slack assistant triage user prompt (the per-call part, precompiled as a Template)
+slack_triage_user_prompt = Template("""
 Please determine how to handle the below Slack message:
 
-Channel: {channel}
-From: {author}
-Message: {message}"""
+Channel: $channel
+From: $author
+Message: $message""")
+
+# Slack assistant triage user prompt for several messages in one call
+slack_triage_batch_user_prompt = Template("""
+Please determine how to handle each of the below Slack messages.
+Return exactly one result per message, in the same order as the messages are numbered.
+
+$messages""")
+
+slack_triage_batch_item = Template("""$index. Channel: $channel
+   From: $author
+   Message: $message""")
 
 # Default background information for IT Head
 default_slack_background = """ 
@@ -98,17 +121,26 @@ The message should:
 - Be appropriate for the context and sender
 """
 
-notification_user_prompt = """
+# string.Template is parsed once here rather than on every str.format call
+notification_user_prompt = Template("""
 Generate a notification message for this information:
 
-Channel: {channel}
-From: {author}
-Message: {message}
-Classification: {classification}
-Reasoning: {reasoning}
+Channel: $channel
+From: $author
+Message: $message
+Classification: $classification
+Reasoning: $reasoning
 
 Create a brief, professional notification that acknowledges this information.
-"""
+""")
+
+# System prompts are formatted once at import so every request sends a
+# byte-identical prefix and the provider's prompt cache can be reused.
+SLACK_TRIAGE_SYSTEM_PROMPT = slack_triage_system_prompt.format(
+    background=default_slack_background,
+    slack_triage_instructions=default_slack_triage_instructions
+)
+NOTIFICATION_SYSTEM_PROMPT = notification_system_prompt
 
 class RouterSchema(BaseModel):
     """Analyze the message and classify it."""
@@ -121,6 +153,16 @@ class RouterSchema(BaseModel):
         "'notify' for important information that doesn't need a response, "
         "'respond' for messages that need a reply",
     )
+    confidence: float = Field(
+        description="Confidence in the classification, from 0.0 (guessing) to 1.0 (certain)."
+    )
+
+class BatchRouterSchema(BaseModel):
+    """Classify several messages at once."""
+
+    results: list[RouterSchema] = Field(
+        description="One classification per message, in the same order as the messages."
+    )
 
 class NotificationResponseSchema(BaseModel):
     """Schema for the LLM's response to generate a notification message."""
@@ -128,9 +170,105 @@ class NotificationResponseSchema(BaseModel):
         description="The generated notification message."
     )
     
-llm = init_chat_model("openai:gpt-4.1", temperature=0.0)
-llm_router = llm.with_structured_output(RouterSchema) 
-llm_notification = llm.with_structured_output(NotificationResponseSchema)
+LLM_MODEL = "openai:gpt-4.1"
+
+# Two-tier routing: the small model classifies first and the message is
+# re-classified with LLM_MODEL only when its confidence is below the threshold.
+# Set ROUTER_MODEL_SMALL="" to always route with LLM_MODEL.
+ROUTER_MODEL_SMALL = os.getenv("ROUTER_MODEL_SMALL", "openai:gpt-4.1-mini")
+ROUTER_ESCALATION_THRESHOLD = float(os.getenv("ROUTER_ESCALATION_THRESHOLD", "0.7"))
+
+# Shared checkpoint store for interrupted (HITL) threads
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+
+# Set STRICT_VALIDATION=true to validate responses with Pydantic (useful when debugging prompts)
+STRICT_VALIDATION = os.getenv("STRICT_VALIDATION", "false").lower() == "true"
+
+# One pooled HTTP client per process, sized for a full cron batch of concurrent
+# calls, so TLS connections to the provider are kept alive between messages
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "30"))
+llm_http_limits = httpx.Limits(
+    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS
+)
+openai_http_clients = {
+    "http_client": httpx.Client(limits=llm_http_limits, timeout=LLM_HTTP_TIMEOUT_SECONDS),
+    "http_async_client": httpx.AsyncClient(limits=llm_http_limits, timeout=LLM_HTTP_TIMEOUT_SECONDS),
+}
+
+def chat_model(model: str):
+    """Initialise a chat model, sharing the pooled HTTP clients where supported."""
+    # Only the OpenAI integration accepts custom httpx clients
+    return init_chat_model(
+        model,
+        temperature=0.0,
+        **(openai_http_clients if model.startswith("openai:") else {})
+    )
+
+llm = chat_model(LLM_MODEL)
+llm_small = chat_model(ROUTER_MODEL_SMALL) if ROUTER_MODEL_SMALL else None
+
+def structured_llm(schema: type[BaseModel], construct=None, model=None):
+    """Bind model (default: llm) to return {"raw": AIMessage, "parsed": schema instance}.
+
+    By default the model is constrained with a JSON schema response format and
+    the reply is parsed with orjson into schema.model_construct, skipping
+    Pydantic validation on the hot path. `construct` builds the instance from
+    the decoded JSON when the schema nests other models.
+    """
+    model = model or llm
+    if STRICT_VALIDATION:
+        return model.with_structured_output(schema, include_raw=True)
+
+    construct = construct or (lambda data: schema.model_construct(**data))
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+    }
+    return model.bind(response_format=response_format) | RunnableLambda(
+        lambda raw: {"raw": raw, "parsed": construct(orjson.loads(raw.content))}
+    )
+
+llm_router = structured_llm(RouterSchema)
+llm_router_small = structured_llm(RouterSchema, model=llm_small) if llm_small else None
+llm_batch_router = structured_llm(
+    BatchRouterSchema,
+    lambda data: BatchRouterSchema.model_construct(
+        results=[RouterSchema.model_construct(**result) for result in data["results"]]
+    ),
+    model=llm_small,
+)
+llm_notification = structured_llm(NotificationResponseSchema)
+
+def system_message(content: str) -> dict:
+    """Build the system message, marking it cacheable for providers that need it."""
+    if LLM_MODEL.startswith("anthropic:"):
+        # Anthropic only caches prefixes explicitly tagged with cache_control
+        return {
+            "role": "system",
+            "content": [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+        }
+    # OpenAI caches identical prefixes automatically
+    return {"role": "system", "content": content}
+
+def log_prompt_cache_usage(node: str, raw_response):
+    """Log how many prompt tokens were served from the provider's prefix cache."""
+    usage = getattr(raw_response, "usage_metadata", None) or {}
+    cached_tokens = usage.get("input_token_details", {}).get("cache_read", 0)
+    logger.info("%s prompt cache: %s/%s input tokens cached", node, cached_tokens, usage.get("input_tokens", 0))
+
+# Exact-match caches so repeated messages ("thanks!", "+1") skip the LLM call
+classification_cache = LLMResponseCache("classify_message")
+notification_cache = LLMResponseCache("ai_notification")
+
+# Embedding-similarity cache so paraphrases ("sick today" / "out sick, WFH")
+# reuse a prior classification. Opt-in: every exact-cache miss pays an extra
+# embeddings API round trip, so enable it with SEMANTIC_CACHE_ENABLED=true
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED:
+    semantic_cache = SemanticCache(init_embeddings("openai:text-embedding-3-small", **openai_http_clients))
 
 class State(TypedDict):
     input: str
@@ -140,176 +278,278 @@ class State(TypedDict):
     author: str
     channel: str
     message: str
-    messages: list[dict]
+    # Nodes return only their new messages; operator.add appends them, so the
+    # history isn't copied (and re-checkpointed) in full by every node
+    messages: Annotated[list[dict], operator.add]
     notification_message: str
 
+class ParsedMessage(NamedTuple):
+    channel: str
+    author: str
+    message: str
+
 #{"input": "C09A2NZNEBS|U0999D7H9M0|Can you sign the RR?"}
-def parse_message(message_data: str) -> tuple[str, str, str]:
-    parts = message_data.split("|")
-    return parts[0].strip(), parts[1].strip(), parts[2].strip()
+@lru_cache(maxsize=2048)
+def parse_message(message_data: str) -> ParsedMessage:
+    """Split a "channel|user|text" input.
+
+    Inputs come from MessageProcessor.format_input_for_api, which joins Slack's
+    channel and user IDs (never whitespace-padded) with "|", so no stripping is
+    needed. Cached because the same input is parsed again on retries and
+    batch re-runs.
+    """
+    # partition avoids building a list and leaves any "|" in the text intact
+    channel, _, rest = message_data.partition("|")
+    author, _, message = rest.partition("|")
+    return ParsedMessage(channel, author, message)
+
+def lookup_cached_classification(channel: str, message: str):
+    """Check the exact and semantic caches; returns (cached, cache_key, embedding)."""
+    normalized_message = normalize_message(message)
+    cache_key = make_cache_key(channel, normalized_message)
+    cached = classification_cache.get(cache_key)
+    embedding = None
+    if cached is None and semantic_cache is not None:
+        try:
+            embedding = semantic_cache.embed(normalized_message)
+            cached = semantic_cache.lookup(embedding, channel)
+        except Exception as e:
+            # A cache failure is a miss; the LLM still classifies the message
+            logger.error("❌ Semantic cache lookup failed: %s", e)
+            cached, embedding = None, None
+        if cached is not None:
+            classification_cache.set(cache_key, cached)
+    return cached, cache_key, embedding
+
+def store_classification(channel: str, cache_key: str, embedding, classification: str, reasoning: str):
+    """Record a fresh LLM classification in the exact and semantic caches."""
+    classification_cache.set(cache_key, (classification, reasoning))
+    if embedding is not None:
+        semantic_cache.add(embedding, (classification, reasoning), channel)
+
+def needs_escalation(result) -> bool:
+    """Whether a small-model classification is too uncertain to keep."""
+    confidence = getattr(result, "confidence", None)
+    return confidence is None or confidence < ROUTER_ESCALATION_THRESHOLD
+
+def route(prompt: list[dict]):
+    """Classify with the small router, escalating low-confidence results to llm_router."""
+    if llm_router_small is not None:
+        response = llm_router_small.invoke(prompt)
+        if not needs_escalation(response["parsed"]):
+            return response
+        logger.info("Escalating classification to %s", LLM_MODEL)
+    return llm_router.invoke(prompt)
+
+def classify_messages_batch(states: list[State]) -> list[dict]:
+    """Classify several messages with a single router call.
+
+    Cached messages are answered locally; the rest are sent as one numbered
+    prompt so the system prompt and request overhead are paid once per batch.
+    Raises ValueError if the model doesn't return one result per message.
+    """
+    results = [None] * len(states)
+    pending = []
+    for index, state in enumerate(states):
+        channel, author, message = parse_message(state["input"])
+        cached, cache_key, embedding = lookup_cached_classification(channel, message)
+        if cached is not None:
+            classification, reasoning = cached
+            results[index] = {"classification": classification, "reasoning": reasoning}
+        else:
+            pending.append((index, channel, author, message, cache_key, embedding))
+
+    if pending:
+        user_prompt = slack_triage_batch_user_prompt.substitute(
+            messages="\n\n".join(
+                slack_triage_batch_item.substitute(index=number, channel=channel, author=author, message=message)
+                for number, (_, channel, author, message, _, _) in enumerate(pending, 1)
+            )
+        )
+        response = llm_batch_router.invoke(
+            [
+                system_message(SLACK_TRIAGE_SYSTEM_PROMPT),
+                {"role": "user", "content": user_prompt},
+            ]
+        )
+        log_prompt_cache_usage("classify_messages_batch", response["raw"])
+        batch = response["parsed"]
+        if batch is None or len(batch.results) != len(pending):
+            raise ValueError(f"Expected {len(pending)} classifications, got {len(batch.results) if batch else 0}")
+
+        for (index, channel, author, message, cache_key, embedding), result in zip(pending, batch.results):
+            if llm_small is not None and needs_escalation(result):
+                # Re-classify just this message with the full model
+                logger.info("Escalating batch item %s to %s", index, LLM_MODEL)
+                result = llm_router.invoke(classification_prompt(channel, author, message))["parsed"]
+            store_classification(channel, cache_key, embedding, result.classification, result.reasoning)
+            results[index] = {"classification": result.classification, "reasoning": result.reasoning}
+
+    return results
 
 def process_message(state):
-    print("---process_message---", state)
+    logger.debug("---process_message--- %s", state)
     pass
 
-def classify_message(state: State):
-    """Message classifier that uses RouterSchema to classify the message."""
-    print("---classify_message---", state)
-
+def classification_prompt(channel: str, author: str, message: str) -> list[dict]:
+    """Build the router prompt; the static system prompt goes first so the cached prefix covers it."""
+    return [
+        system_message(SLACK_TRIAGE_SYSTEM_PROMPT),
+        {"role": "user", "content": slack_triage_user_prompt.substitute(
+            channel=channel, author=author, message=message
+        )},
+    ]
+
+def prepare_classification(state: State):
+    """Parse the input and resolve the classification without the LLM where possible.
+
+    Returns (channel, author, message, known, cache_key, embedding) where known
+    is a (classification, reasoning) tuple, or None if the router must be called.
+    """
     message_data = state.get("input", state)
     channel, author, message = parse_message(message_data)
-    
-    # Use the existing router schema and prompts
-    system_prompt = slack_triage_system_prompt.format(
-        background=default_slack_background,
-        slack_triage_instructions=default_slack_triage_instructions
-    )
 
-    user_prompt = slack_triage_user_prompt.format(
-        channel=channel, author=author, message=message
-    )
-
-    # Get classification using the existing router
-    result = llm_router.invoke(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
-    )
-
-    print("---result---", result)
-    
-    # Return the classification results to update the state
+    if state.get("classification"):
+        # Already classified upstream (see classify_messages_batch)
+        return channel, author, message, (state["classification"], state.get("reasoning", "")), None, None
+
+    cached, cache_key, embedding = lookup_cached_classification(channel, message)
+    if cached is not None:
+        logger.info("classify_message cache hit: %s", cached[0])
+    return channel, author, message, cached, cache_key, embedding
+
+def finish_classification(response, channel: str, cache_key: str, embedding) -> tuple[str, str]:
+    """Unpack a router response and record it in the caches."""
+    log_prompt_cache_usage("classify_message", response["raw"])
+    result = response["parsed"]
+    logger.debug("---result--- %s", result)
+    store_classification(channel, cache_key, embedding, result.classification, result.reasoning)
+    return result.classification, result.reasoning
+
+def classification_update(channel: str, author: str, message: str, classification: str, reasoning: str) -> dict:
+    """State update returned by the classify_message node."""
     return {
-        "classification": result.classification,
-        "reasoning": result.reasoning,
+        "classification": classification,
+        "reasoning": reasoning,
         "author": author,
         "channel": channel,
-        "author": author,
         "message": message,
         "messages": [
             {
                 "role": "assistant",
-                "content": f"Classification: {result.classification}\nReasoning: {result.reasoning}"
+                "content": f"Classification: {classification}\nReasoning: {reasoning}"
             }
         ]
-    }  
-
-    # Fake classification and reasoning
-    # classifications = ["respond", "respond", "respond"]
-    # reasonings = ["Not important", "Be informed", "Important and respond"]
-    # classification = random.choice(classifications)
-    # reasoning = random.choice(reasonings)
-    # return {
-    #     "classification": classification,
-    #     "reasoning": reasoning,
-    #     "author": author,
-    #     "channel": channel,
-    #     "author": author,
-    #     "message": message,
-    #     "messages": [
-    #         {
-    #             "role": "assistant",
-    #             "content": f"Classification: {classification}\nReasoning: {reasoning}"
-    #         }
-    #     ]
-    # }  
+    }
 
+def classify_message(state: State):
+    """Message classifier that uses RouterSchema to classify the message."""
+    logger.debug("---classify_message--- %s", state)
+
+    channel, author, message, known, cache_key, embedding = prepare_classification(state)
+    if known is None:
+        response = route(classification_prompt(channel, author, message))
+        known = finish_classification(response, channel, cache_key, embedding)
+
+    # Return the classification results to update the state
+    return classification_update(channel, author, message, *known)
 
 def decision_maker(state: State):
-    print("---decision_maker---", state)
+    logger.debug("---decision_maker--- %s", state)
     # This node just passes through the classification for routing
     return {"classification": state["classification"]}
 
 def human_feedback(state):
-    print("---human_feedback---")
+    logger.debug("---human_feedback---")
     feedback = interrupt("Please provide feedback:")
-    print(f"Feedback: {feedback}")
+    logger.debug("Feedback: %s", feedback)
     return {"user_feedback": feedback}
 
-def ai_notification(state: State):
-    """Generate a notification message using LLM for important information."""
-    print("--- ai_notification ---")
-    
-    # Use the existing llm instance with structured output for notifications
-    llm_with_notification = llm.with_structured_output(NotificationResponseSchema)
-    result = llm_notification.invoke(
-        [
-            {"role": "system", "content": notification_system_prompt},
-            {"role": "user", "content": notification_user_prompt.format(
-                channel=state["channel"],
-                author=state["author"],
-                message=state["message"],
-                classification=state["classification"],
-                reasoning=state["reasoning"]
-            )},
-        ]
-    )
-    
-    print(f"🔔 AI Notification: {result.notification_message}")
+def notification_prompt(state: State) -> list[dict]:
+    """Build the notification prompt for a classified message."""
+    return [
+        system_message(NOTIFICATION_SYSTEM_PROMPT),
+        {"role": "user", "content": notification_user_prompt.substitute(
+            channel=state["channel"],
+            author=state["author"],
+            message=state["message"],
+            classification=state["classification"],
+            reasoning=state["reasoning"]
+        )},
+    ]
+
+def notification_update(state: State, notification_message: str) -> dict:
+    """State update returned by the ai_notification node."""
+    logger.debug("🔔 AI Notification: %s", notification_message)
     
     return {
-        "notification_message": result.notification_message,
-        "messages": state.get("messages", []) + [
+        "notification_message": notification_message,
+        # Appended to the existing history by the State reducer
+        "messages": [
             {
                 "role": "assistant", 
-                "content": f"🔔 Notification: {result.notification_message}"
+                "content": f"🔔 Notification: {notification_message}"
             }
         ]
     }
 
-    # Fake notification message
-    # notification_message = "Thanks for the message!"
-    # return {
-    #     "notification_message": notification_message,
-    #     "messages": state.get("messages", []) + [
-    #         {
-    #             "role": "assistant", 
-    #             "content": f"🔔 Notification: {notification_message}"
-    #         }
-    #     ]
-    # }
+def ai_notification(state: State):
+    """Generate a notification message using LLM for important information."""
+    logger.debug("--- ai_notification ---")
+    
+    cache_key = make_cache_key(state["classification"], normalize_message(state["message"]))
+    notification_message = notification_cache.get(cache_key)
+    if notification_message is not None:
+        logger.info("ai_notification cache hit")
+    else:
+        response = llm_notification.invoke(notification_prompt(state))
+        log_prompt_cache_usage("ai_notification", response["raw"])
+        notification_message = response["parsed"].notification_message
+        notification_cache.set(cache_key, notification_message)
+    
+    return notification_update(state, notification_message)
+
 
 def end(state: State):
-    print("--- end ---")
+    logger.debug("--- end ---")
     return {}
 
-builder = StateGraph(State)
-builder.add_node("process_message", process_message)
-builder.add_node("classify_message", classify_message)
-builder.add_node("decision_maker", decision_maker)
-builder.add_node("human_feedback", human_feedback)
-builder.add_node("ai_notification", ai_notification)
-builder.add_node("end", end)
-
-builder.add_edge(START, "process_message")
-builder.add_edge("process_message", "classify_message")
-builder.add_edge("classify_message", "decision_maker")
-builder.add_conditional_edges(
-    "decision_maker",
-    lambda state: state["classification"],
-    {
-        "respond": "human_feedback",
-        "notify": "ai_notification", 
-        "ignore": "end"
-    }
-)
-builder.add_edge("human_feedback", "end")
-builder.add_edge("ai_notification", "end")
-builder.add_edge("end", END)
-
-# Set up memory
-memory = InMemorySaver()
-
-# Add
-RUN_LOCAL = False
-if RUN_LOCAL:
-    graph = builder.compile()
-else:
-    graph = builder.compile(checkpointer=memory)
-
-# View
-# display(Image(graph.get_graph().draw_mermaid_png()))
+@lru_cache(maxsize=1)
+def get_graph():
+    """Build and compile the graph once per process; later calls return the same instance."""
+    builder = StateGraph(State)
+    builder.add_node("process_message", process_message)
+    builder.add_node("classify_message", classify_message)
+    builder.add_node("decision_maker", decision_maker)
+    builder.add_node("human_feedback", human_feedback)
+    builder.add_node("ai_notification", ai_notification)
+    builder.add_node("end", end)
+
+    builder.add_edge(START, "process_message")
+    builder.add_edge("process_message", "classify_message")
+    builder.add_edge("classify_message", "decision_maker")
+    builder.add_conditional_edges(
+        "decision_maker",
+        lambda state: state["classification"],
+        {
+            "respond": "human_feedback",
+            "notify": "ai_notification", 
+            "ignore": "end"
+        }
+    )
+    builder.add_edge("human_feedback", "end")
+    builder.add_edge("ai_notification", "end")
+    builder.add_edge("end", END)
+
+    # Checkpoints live in SQLite so any worker (or a restarted one) can resume a thread.
+    # SqliteSaver is sync-only: drive the graph with invoke/stream, never ainvoke/astream
+    # (the API runs it from sync endpoints or run_in_threadpool).
+    connection = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+    graph = builder.compile(checkpointer=SqliteSaver(connection))
+
+    return graph
+
+graph = get_graph()
 
 # Input
 """
@@ -0,0 +1,191 @@
+"""
+Client-side caches for LLM results used by the agent graph
+"""
+
+import os
+import json
+import hashlib
+import atexit
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Optional Redis backend so the API and cron processes can share cache hits
+LLM_CACHE_REDIS_URL = os.getenv("LLM_CACHE_REDIS_URL")
+LLM_CACHE_MAXSIZE = int(os.getenv("LLM_CACHE_MAXSIZE", "4096"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+
+# Semantic cache: cosine similarity above which a prior classification is reused.
+# Tune on held-out labeled message pairs before lowering it.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAXSIZE = int(os.getenv("SEMANTIC_CACHE_MAXSIZE", "10000"))
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH")
+# Persist after this many new entries (and at exit) rather than on every add
+SEMANTIC_CACHE_SAVE_EVERY = int(os.getenv("SEMANTIC_CACHE_SAVE_EVERY", "100"))
+
+def normalize_message(message: str) -> str:
+    """Lowercase and collapse whitespace so trivially different messages share a key"""
+    return " ".join(message.lower().split())
+
+def make_cache_key(*parts: str) -> str:
+    """Hash the key parts into a short, fixed-size cache key"""
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+class LLMResponseCache:
+    """Exact-match cache mapping a hashed prompt key to a JSON-serializable result"""
+
+    def __init__(self, namespace: str, maxsize: int = LLM_CACHE_MAXSIZE):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._redis = None
+        if LLM_CACHE_REDIS_URL:
+            import redis  # Only required when the Redis backend is enabled
+            self._redis = redis.Redis.from_url(LLM_CACHE_REDIS_URL)
+
+    def get(self, key: str):
+        """Return the cached result for key, or None on a miss"""
+        if self._redis is not None:
+            try:
+                value = self._redis.get(f"{self.namespace}:{key}")
+                return json.loads(value) if value is not None else None
+            except Exception as e:
+                logger.error(f"❌ Error reading LLM cache from Redis: {e}")
+                return None
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        """Store a result for key, evicting the least recently used entry when full"""
+        if self._redis is not None:
+            try:
+                self._redis.set(f"{self.namespace}:{key}", json.dumps(value), ex=LLM_CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.error(f"❌ Error writing LLM cache to Redis: {e}")
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+class SemanticCache:
+    """Nearest-neighbour cache over L2-normalized message embeddings, matched within a channel"""
+
+    def __init__(self, embeddings, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 maxsize: int = SEMANTIC_CACHE_MAXSIZE, path: str = SEMANTIC_CACHE_PATH,
+                 save_every: int = SEMANTIC_CACHE_SAVE_EVERY):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.path = path
+        self.save_every = save_every
+        # Ring buffer: (maxsize, dim) rows allocated on the first add and overwritten
+        # in place, so adding never copies the matrix
+        self._vectors = None
+        self._values = [None] * maxsize
+        # Channel of each slot; lookups only match entries from the same channel,
+        # like the exact cache's (channel, message) key
+        self._channels = np.empty(maxsize, dtype=object)
+        self._next = 0
+        self._count = 0
+        self._unsaved = 0
+        self._lock = Lock()
+        if path:
+            if os.path.exists(path):
+                self._load()
+            atexit.register(self.save)
+
+    def __len__(self):
+        return self._count
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as a unit-length float32 vector"""
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def lookup(self, vector: np.ndarray, channel: str):
+        """Return the value of the most similar entry in channel if it clears the threshold"""
+        with self._lock:
+            if not self._count:
+                return None
+            in_channel = self._channels[:self._count] == channel
+            if not in_channel.any():
+                return None
+            # Inner product of unit vectors is the cosine similarity
+            scores = np.where(in_channel, self._vectors[:self._count] @ vector, -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            logger.info("Semantic cache hit (similarity %.3f)", scores[best])
+            return self._values[best]
+
+    def add(self, vector: np.ndarray, value, channel: str):
+        """Add a channel's embedding and its value, overwriting the oldest entry when full"""
+        with self._lock:
+            self._put(vector, value, channel)
+            self._unsaved += 1
+            due = self.path and self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def _put(self, vector: np.ndarray, value, channel: str):
+        if self._vectors is None:
+            self._vectors = np.empty((self.maxsize, vector.shape[0]), dtype=np.float32)
+        self._vectors[self._next] = vector
+        self._values[self._next] = value
+        self._channels[self._next] = channel
+        self._next = (self._next + 1) % self.maxsize
+        self._count = min(self._count + 1, self.maxsize)
+
+    def _ordered(self):
+        """Slot indices from oldest to newest entry"""
+        return [(self._next - self._count + i) % self.maxsize for i in range(self._count)]
+
+    def save(self):
+        """Write the cache to path if it has unsaved entries"""
+        with self._lock:
+            if not self.path or not self._unsaved:
+                return
+            # Snapshot under the lock; the disk write happens outside it
+            order = self._ordered()
+            vectors = self._vectors[order]
+            values = [self._values[i] for i in order]
+            channels = [self._channels[i] for i in order]
+            self._unsaved = 0
+        try:
+            # Write through a file handle so numpy doesn't append ".npz" to the path
+            with open(self.path, "wb") as f:
+                np.savez(
+                    f, vectors=vectors,
+                    values=np.array(json.dumps(values)), channels=np.array(json.dumps(channels)),
+                )
+        except Exception as e:
+            logger.error("❌ Error saving semantic cache: %s", e)
+
+    def _load(self):
+        try:
+            data = np.load(self.path)
+            vectors = data["vectors"]
+            values = json.loads(str(data["values"]))
+            if "channels" not in data:
+                # Written before entries were keyed by channel; they can't be matched safely
+                logger.info("Ignoring semantic cache file without channels: %s", self.path)
+                return
+            channels = json.loads(str(data["channels"]))
+            # Saved oldest first; keep the newest maxsize entries
+            for vector, value, channel in list(zip(vectors, values, channels))[-self.maxsize:]:
+                self._put(vector, value, channel)
+            logger.info("Loaded %s semantic cache entries from %s", self._count, self.path)
+        except Exception as e:
+            logger.error("❌ Error loading semantic cache: %s", e)
@@ -1,39 +1,57 @@
 # api.py
-from fastapi import FastAPI
+from fastapi import FastAPI, BackgroundTasks
+from fastapi.responses import Response, StreamingResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
 import uuid
 from langgraph.types import Command
-from agent_graph.graph import graph  # Import from the existing graph.py file
+from agent_graph.graph import get_graph, classify_messages_batch  # Import from the existing graph.py file
 from datetime import datetime
-from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Iterator
 # Removed requests import - no longer needed
 import os
 from dotenv import load_dotenv
 import json
 import logging
+from api.ndjson import MEDIA_TYPE, dumps, encode_line, merge_records
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+# LOG_LEVEL=DEBUG shows the per-node graph traces
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# ---------- FastAPI App ----------
-app = FastAPI()
-
-# Store thread states in memory for now
-# Key = thread_id (UUID), Value = user session config
-thread_store = {}
-
-# Removed message_store - now handled by database in message_processor.py
-
 # Slack client for sending responses
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 slack_client = None
 if SLACK_BOT_TOKEN:
-    from slack_sdk.web import WebClient
-    slack_client = WebClient(token=SLACK_BOT_TOKEN)
+    # Async client so posting to Slack doesn't hold the event loop for the API round trip
+    from slack_sdk.web.async_client import AsyncWebClient
+    slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Give the Slack client one pooled aiohttp session for the worker's lifetime"""
+    session = None
+    if slack_client:
+        # Without a session, AsyncWebClient opens (and TLS-handshakes) a new one per call
+        import aiohttp
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=60))
+        slack_client.session = session
+    yield
+    if session:
+        await session.close()
+
+# ---------- FastAPI App ----------
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Compiled once per worker process and shared by every request
+graph = get_graph()
+
+# Removed message_store - now handled by database in message_processor.py
 
 class StartRequest(BaseModel):
     input: str
@@ -43,6 +61,9 @@ class StartRequest(BaseModel):
     slack_thread_ts: Optional[str] = None
     slack_text: Optional[str] = None
 
+class StartBatchRequest(BaseModel):
+    messages: list[StartRequest]
+
 class HumanFeedback(BaseModel):
     feedback: str = "Your analysis or feedback about the message"
     slack_response: Optional[str] = None
@@ -80,7 +101,7 @@ def health_check():
 
 # Removed message endpoints - now handled by database queries in message_processor.py
 
-def send_slack_response(channel: str, message: str, thread_ts: str = None):
+async def send_slack_response(channel: str, message: str, thread_ts: str = None):
     """Send response to Slack channel"""
     if not slack_client:
         logger.error("❌ Slack client not initialized")
@@ -90,66 +111,81 @@ def send_slack_response(channel: str, message: str, thread_ts: str = None):
         # Add bot identifier to prevent infinite loops
         bot_message = f"[BOT_RESPONSE] {message}"
         
-        response = slack_client.chat_postMessage(
+        response = await slack_client.chat_postMessage(
             channel=channel,
             text=bot_message,
             thread_ts=thread_ts
         )
         return response["ok"]
     except Exception as e:
-        logger.error(f"❌ Error sending Slack response: {e}")
+        logger.error("❌ Error sending Slack response: %s", e)
         return False
 
-def serialize_event(event):
-    """Convert event to JSON-serializable format"""
+# Removed store_message_result function - now handled by message_processor.py
+
+def stream_thread(graph_input, thread: Dict[str, Any], header: Dict[str, Any], done_status: str) -> Iterator[Dict[str, Any]]:
+    """Yield the header, one record per graph update, then a final status record."""
+    yield header
     try:
-        # If it's already a dict, return it
-        if isinstance(event, dict):
-            return event
-        # If it's a string, try to parse it as JSON
-        elif isinstance(event, str):
-            import json
-            return json.loads(event)
-        # For other types, convert to dict if possible
-        else:
-            return event.__dict__ if hasattr(event, '__dict__') else str(event)
+        for event in graph.stream(graph_input, thread, stream_mode="updates"):
+            # Serialized once, by orjson, when the record is written to the stream
+            yield {"event": event}
+        yield {"status": done_status}
     except Exception as e:
-        logger.error(f"Error serializing event: {e}")
-        return {"error": f"Could not serialize event: {str(event)}"}
+        logger.error("Error in graph execution: %s", e)
+        yield {"status": "error", "error": str(e), "thread_id": None, "message_id": None}
 
-# Removed store_message_result function - now handled by message_processor.py
+def stream_new_thread(initial_state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Stream a fresh graph thread until completion or the first interrupt."""
+    thread_id = str(uuid.uuid4())
+    thread = {"configurable": {"thread_id": thread_id}}
+
+    # Generate a simple message ID for reference
+    message_id = f"msg_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+
+    # The ids go out first so clients can track the thread before the LLM call finishes
+    header = {"status": "started", "thread_id": thread_id, "message_id": message_id}
+    return stream_thread(initial_state, thread, header, "completed")
+
+def ndjson_response(records: Iterator[Dict[str, Any]]) -> StreamingResponse:
+    """Send records to the client as they are produced, one JSON object per line."""
+    return StreamingResponse((encode_line(record) for record in records), media_type=MEDIA_TYPE)
 
 @app.post("/start")
 def start_execution(req: StartRequest):
-    """Start the graph execution until first interrupt."""
-    logger.info(f"API START REQUEST --->: {req}")
-    try:
-        thread_id = str(uuid.uuid4())
-        thread = {"configurable": {"thread_id": thread_id}}
+    """
+    Start the graph execution until first interrupt.
+    
+    Streams NDJSON: a header with thread_id/message_id, one {"event": ...} line
+    per graph update, then a final {"status": ...} line.
+    """
+    logger.info("API START REQUEST --->: %s", req)
+    return ndjson_response(stream_new_thread({"input": req.input}))
 
-        output_events = []
-        for event in graph.stream({"input": req.input}, thread, stream_mode="updates"):
-            serialized_event = serialize_event(event)
-            output_events.append(serialized_event)
+@app.post("/start_batch")
+def start_batch_execution(req: StartBatchRequest):
+    """
+    Start graph executions for several messages, classifying them in one LLM call.
+    
+    Each message still gets its own thread (so respond-class messages can be
+    resumed individually); only the classification step is shared. If the
+    batch classification fails, every message falls back to the single path.
+    """
+    logger.info("API START BATCH REQUEST --->: %s messages", len(req.messages))
+    initial_states = [{"input": message.input} for message in req.messages]
 
-        # Store thread in memory for resume functionality
-        thread_store[thread_id] = thread
-        
-        # Generate a simple message ID for reference
-        message_id = f"msg_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
-        
+    try:
+        classifications = classify_messages_batch(initial_states)
+        for state, classified in zip(initial_states, classifications):
+            state.update(classified)
     except Exception as e:
-        logger.error(f"Error in graph execution: {e}")
-        thread_id = None
-        message_id = None
-        output_events = []
+        logger.error("Batch classification failed, falling back to single classification: %s", e)
 
-    return {
+    result = {
         "status": "completed",
-        "thread_id": thread_id,
-        "message_id": message_id,
-        "events": output_events
+        "results": [merge_records(stream_new_thread(state)) for state in initial_states]
     }
+    return Response(content=dumps(result), media_type="application/json")
 
 @app.post("/resume")
 def resume_execution(req: ResumeRequest):
@@ -158,7 +194,8 @@ def resume_execution(req: ResumeRequest):
     
     This endpoint allows resuming a conversation thread that was paused for human review.
     The human feedback is used to continue the workflow, and optionally a Slack response
-    can be provided to send to the original channel.
+    can be provided to send to the original channel. The result is streamed as NDJSON
+    in the same framing as /start.
     
     Example request:
     ```json
@@ -171,14 +208,22 @@ def resume_execution(req: ResumeRequest):
     }
     ```
     """
-    thread_id = req.thread_id
-    if thread_id not in thread_store:
+    records = resume_records(req)
+    if records is None:
         return {"error": "Invalid thread_id"}
+    return ndjson_response(records)
+
+def resume_records(req: ResumeRequest) -> Optional[Iterator[Dict[str, Any]]]:
+    """Build the resume command for a paused thread and return its record stream (None if unknown)"""
+    thread_id = req.thread_id
+    thread = {"configurable": {"thread_id": thread_id}}
+    # Threads are resumable from the shared checkpointer, no matter which worker started them
+    if not graph.get_state(thread).values:
+        return None
 
-    thread = thread_store[thread_id]
     human_feedback = req.human_feedback
 
-    logger.info(f"RESUME REQUEST --->: {req}")
+    logger.info("RESUME REQUEST --->: %s", req)
     
     # Extract human's Slack response if provided
     slack_response = human_feedback.slack_response
@@ -188,28 +233,54 @@ def resume_execution(req: ResumeRequest):
         "feedback": human_feedback.feedback,
         "optional_data": thread_id
     }
-    logger.info(f"Resuming with: {resume_dict}")
+    logger.info("Resuming with: %s", resume_dict)
     resume_cmd = Command(resume=resume_dict)
 
-    output_events = []
-    for event in graph.stream(resume_cmd, thread, stream_mode="updates"):
-        serialized_event = serialize_event(event)
-        output_events.append(serialized_event)
-
-    # If human provided a Slack response, send it
-    if slack_response:
-        logger.info(f"📤 Sending human's Slack response: {slack_response}")
-        # Note: In a real implementation, you'd need to get the channel from the database
-        # For now, we'll just log it
-        logger.info(f"   Human response: {slack_response}")
-        logger.info(f"   (Channel would be retrieved from database using thread_id)")
-
-    return {
-        "status": "resumed",
+    header = {
+        "status": "resuming",
         "thread_id": thread_id,
-        "events": output_events,
         "human_slack_response": slack_response
     }
+    return stream_thread(resume_cmd, thread, header, "resumed")
+
+class ResumeAndSendRequest(ResumeRequest):
+    channel: str
+    thread_ts: Optional[str] = None
+
+@app.post("/resume_and_send")
+async def resume_and_send(req: ResumeAndSendRequest):
+    """
+    Resume a paused thread and post the human's Slack response in one round trip.
+    
+    Returns the merged /resume result plus "slack_status": "success", "error",
+    or "skipped" (no slack_response given, or the resume failed).
+    
+    Example request:
+    ```json
+    {
+      "thread_id": "123e4567-e89b-12d3-a456-426614174000",
+      "human_feedback": {
+        "feedback": "This is a technical issue requiring immediate attention",
+        "slack_response": "I'll escalate this to our technical team right away"
+      },
+      "channel": "C1234567890",
+      "thread_ts": "1234567890.123456"
+    }
+    ```
+    """
+    # The graph runs synchronously, so keep it off the event loop
+    records = await run_in_threadpool(resume_records, req)
+    if records is None:
+        return {"error": "Invalid thread_id"}
+    result = await run_in_threadpool(merge_records, records)
+
+    slack_response = req.human_feedback.slack_response
+    if "error" in result or not slack_response:
+        result["slack_status"] = "skipped"
+    else:
+        sent = await send_slack_response(req.channel, slack_response, req.thread_ts)
+        result["slack_status"] = "success" if sent else "error"
+    return Response(content=dumps(result), media_type="application/json")
 
 # Removed /respond/ai/{message_id} and /respond/human/{message_id} endpoints
 # Slack responses are now handled by message_processor.py and database
@@ -218,22 +289,26 @@ class SlackResponseRequest(BaseModel):
     channel: str
     message: str
     thread_ts: Optional[str] = None
+    wait: bool = True
     
     class Config:
         schema_extra = {
             "example": {
                 "channel": "C1234567890",
                 "message": "Your response message here",
-                "thread_ts": "1234567890.123456"
+                "thread_ts": "1234567890.123456",
+                "wait": True
             }
         }
 
 @app.post("/send_slack_response")
-def send_slack_response_endpoint(req: SlackResponseRequest):
+async def send_slack_response_endpoint(req: SlackResponseRequest, background_tasks: BackgroundTasks):
     """
     Send response to Slack channel.
     
     This endpoint sends a message to a specific Slack channel, optionally in a thread.
+    With "wait": false the message is posted in a background task and the endpoint
+    returns "queued" immediately, without knowing whether Slack accepted it.
     
     Example request:
     ```json
@@ -244,8 +319,12 @@ def send_slack_response_endpoint(req: SlackResponseRequest):
     }
     ```
     """
+    if not req.wait:
+        background_tasks.add_task(send_slack_response, req.channel, req.message, req.thread_ts)
+        return {"status": "queued", "message": "Slack response queued"}
+
     try:
-        success = send_slack_response(req.channel, req.message, req.thread_ts)
+        success = await send_slack_response(req.channel, req.message, req.thread_ts)
         
         if success:
             return {"status": "success", "message": "Slack response sent"}
@@ -255,8 +334,37 @@ def send_slack_response_endpoint(req: SlackResponseRequest):
     except Exception as e:
         return {"status": "error", "message": f"Error: {str(e)}"}
 
+# Worker processes share graph checkpoints through the SQLite checkpointer,
+# so /resume can land on a different worker than the /start that paused it
+API_WORKERS = int(os.getenv("API_WORKERS", os.cpu_count() or 1))
+
+def run_server():
+    """Run the API under uvicorn with uvloop/httptools and multiple workers"""
+    # uvloop and httptools are separate optional packages; probe each on its own
+    try:
+        import uvloop  # noqa: F401 - not available on Windows
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "auto"
+
+    # The import-string form is required for uvicorn to spawn worker processes
+    uvicorn.run(
+        "api.api:app",
+        host="0.0.0.0",
+        port=8002,
+        workers=API_WORKERS,
+        loop=loop,
+        http=http,
+        log_level="warning"
+    )
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8002)
+    run_server()
 
     """
    9851cebf-4c03-441a-844e-d6fa27d01cd4
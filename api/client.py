@@ -0,0 +1,45 @@
+"""
+Pooled HTTP session for the sync clients of the API (resumer, dashboard)
+"""
+
+import threading
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeout so a stuck API can't hang the caller forever
+API_TIMEOUT = (3, 30)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def api_session() -> requests.Session:
+    """Session that keeps connections alive and retries connection failures and 502/503/504"""
+    session = requests.Session()
+    # POST isn't in Retry's default allowed_methods, so /resume is never replayed on a status error
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=50,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_api_session() -> requests.Session:
+    """Process-wide api_session(), created on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = api_session()
+    return _session
+
+def post_json(url: str, payload, **kwargs) -> requests.Response:
+    """POST payload serialized with orjson instead of requests' stdlib json"""
+    kwargs.setdefault("timeout", API_TIMEOUT)
+    return get_api_session().post(url, data=orjson.dumps(payload), headers=JSON_HEADERS, **kwargs)
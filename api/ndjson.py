@@ -0,0 +1,37 @@
+"""
+Newline-delimited JSON framing shared by the API's streaming endpoints and their clients.
+
+A stream is one JSON object per line: a header with the thread metadata, then
+one {"event": ...} line per graph update, then a final line carrying the status
+(and "error" if the run failed).
+"""
+
+import orjson
+
+MEDIA_TYPE = "application/x-ndjson"
+
+def _default(obj):
+    """Fallback for objects orjson can't serialize natively"""
+    return obj.__dict__ if hasattr(obj, "__dict__") else str(obj)
+
+def dumps(obj) -> bytes:
+    """Serialize graph output (dicts, dataclasses, arbitrary objects) straight to JSON bytes"""
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def encode_line(record: dict) -> bytes:
+    """Serialize one record as an NDJSON line"""
+    return dumps(record) + b"\n"
+
+def merge_records(records) -> dict:
+    """Fold streamed records into a single {..., "events": [...]} result dict"""
+    result = {"events": []}
+    for record in records:
+        if "event" in record:
+            result["events"].append(record["event"])
+        else:
+            result.update(record)
+    return result
+
+def read_ndjson(lines) -> dict:
+    """Client side: decode NDJSON lines (e.g. response.iter_lines()) into a result dict"""
+    return merge_records(orjson.loads(line) for line in lines if line)
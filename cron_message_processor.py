@@ -3,7 +3,7 @@
 Cron job script to run message processor every 30 seconds
 """
 
-import time
+import asyncio
 import sys
 import os
 import signal
@@ -14,6 +14,7 @@ import logging
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from message_processor.message_processor import MessageProcessor
+from db.db import async_engine, init_db
 
 # Set up logging
 logging.basicConfig(
@@ -36,18 +37,20 @@ class MessageProcessorCron:
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
     
-    def signal_handler(self, signum, frame):
+    def signal_handler(self, signum, frame=None):
         """Handle shutdown signals gracefully"""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
+        # Interrupt a pending wait so shutdown doesn't sit out the poll timeout
+        self.processor.wake()
     
-    def run_single_cycle(self):
+    async def run_single_cycle(self):
         """Run a single processing cycle"""
         try:
             logger.info("🔄 Starting message processing cycle...")
             
             # Process pending messages
-            processed_count = self.processor.process_pending_messages(batch_size=5)
+            processed_count = await self.processor.process_pending_messages(batch_size=5)
             
             if processed_count > 0:
                 logger.info(f"✅ Processed {processed_count} messages in this cycle")
@@ -60,50 +63,77 @@ class MessageProcessorCron:
             logger.error(f"❌ Error in processing cycle: {e}")
             return False
     
+    async def run_once(self):
+        """Run a single cycle, then release the processor's connections before the loop closes"""
+        try:
+            return await self.run_single_cycle()
+        finally:
+            await self.processor.aclose()
+    
     def run_continuous(self):
         """Run the message processor continuously with specified interval"""
+        asyncio.run(self.run_continuous_async())
+    
+    async def run_continuous_async(self):
+        """Event-loop version of the processing loop; cycles await I/O instead of blocking"""
         logger.info(f"🚀 Starting Message Processor Cron (interval: {self.interval_seconds}s)")
         logger.info("Press Ctrl+C to stop")
         
-        cycle_count = 0
+        # Signal handlers registered on the loop can wake it while it waits
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.signal_handler, signum)
         
-        while self.running:
-            try:
-                cycle_count += 1
-                start_time = datetime.now()
-                
-                logger.info(f"📊 Cycle #{cycle_count} started at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        try:
+            # New messages wake the loop through Postgres NOTIFY; the interval is only a fallback
+            if await self.processor.start_listening():
+                logger.info("👂 Woken by new messages; polling as a fallback only")
+        
+            cycle_count = 0
+        
+            while self.running:
+                try:
+                    cycle_count += 1
+                    start_time = datetime.now()
                 
-                # Run processing cycle
-                success = self.run_single_cycle()
+                    logger.info(f"📊 Cycle #{cycle_count} started at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
                 
-                end_time = datetime.now()
-                duration = (end_time - start_time).total_seconds()
+                    # Run processing cycle
+                    success = await self.run_single_cycle()
                 
-                if success:
-                    logger.info(f"✅ Cycle #{cycle_count} completed in {duration:.2f}s")
-                else:
-                    logger.warning(f"⚠️ Cycle #{cycle_count} completed with errors in {duration:.2f}s")
+                    end_time = datetime.now()
+                    duration = (end_time - start_time).total_seconds()
                 
-                # Sleep until next cycle (account for processing time)
-                if self.running:
-                    sleep_time = max(0, self.interval_seconds - duration)
-                    if sleep_time > 0:
-                        logger.info(f"😴 Sleeping for {sleep_time:.2f}s until next cycle...")
-                        time.sleep(sleep_time)
+                    if success:
+                        logger.info(f"✅ Cycle #{cycle_count} completed in {duration:.2f}s")
                     else:
-                        logger.warning(f"⚠️ Processing took longer than interval ({duration:.2f}s > {self.interval_seconds}s)")
+                        logger.warning(f"⚠️ Cycle #{cycle_count} completed with errors in {duration:.2f}s")
                 
-            except KeyboardInterrupt:
-                logger.info("🛑 Received keyboard interrupt, shutting down...")
-                self.running = False
-                break
-            except Exception as e:
-                logger.error(f"❌ Unexpected error in main loop: {e}")
-                if self.running:
-                    logger.info(f"😴 Sleeping for {self.interval_seconds}s before retry...")
-                    time.sleep(self.interval_seconds)
-        
+                    # A cycle close to the interval usually means we're waiting on connections
+                    if duration > 0.8 * self.interval_seconds:
+                        logger.warning(f"⚠️ Cycle #{cycle_count} used {duration / self.interval_seconds:.0%} of the interval; DB pool: {async_engine.pool.status()}")
+                
+                    # Wait for new messages, or until next cycle (account for processing time)
+                    if self.running:
+                        sleep_time = max(0, self.interval_seconds - duration)
+                        if sleep_time > 0:
+                            logger.info("😴 Waiting for new messages until next cycle...")
+                            await self.processor.wait_for_pending_messages(sleep_time)
+                        else:
+                            logger.warning(f"⚠️ Processing took longer than interval ({duration:.2f}s > {self.interval_seconds}s)")
+                
+                except KeyboardInterrupt:
+                    logger.info("🛑 Received keyboard interrupt, shutting down...")
+                    self.running = False
+                    break
+                except Exception as e:
+                    logger.error(f"❌ Unexpected error in main loop: {e}")
+                    if self.running:
+                        logger.info(f"😴 Sleeping for {self.interval_seconds}s before retry...")
+                        await asyncio.sleep(self.interval_seconds)
+        finally:
+            # Close the listener, HTTP client and DB pool while the loop is still running
+            await self.processor.aclose()
         logger.info("👋 Message Processor Cron stopped")
 
 def main():
@@ -123,9 +153,16 @@ def main():
         default=5, 
         help="Number of messages to process per cycle (default: 5)"
     )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Run a single processing cycle and exit (for message-processor-cron.timer)"
+    )
     
     args = parser.parse_args()
     
+    init_db()
+    
     # Create and run the cron job
     cron = MessageProcessorCron(interval_seconds=args.interval)
     
@@ -135,6 +172,10 @@ def main():
         logger.info(f"📦 Batch size set to {args.batch_size}")
     
     try:
+        if args.once:
+            # Scheduled by systemd: no resident process or sleep loop between cycles
+            success = asyncio.run(cron.run_once())
+            sys.exit(0 if success else 1)
         cron.run_continuous()
     except Exception as e:
         logger.error(f"❌ Fatal error: {e}")
@@ -1,13 +1,20 @@
 import os
-import json
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer
+import logging
+import asyncpg
+from dataclasses import dataclass
+from datetime import timedelta
+from sqlalchemy import create_engine, select, update, bindparam, func, or_, and_, text as sql_text, Column, String, DateTime, Text, Integer, SmallInteger, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import insert, JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.types import TypeDecorator
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # PostgreSQL Configuration
 POSTGRES_HOST = "localhost"
 POSTGRES_PORT = "5434"
@@ -17,13 +24,93 @@ POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
 
 # Database setup
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-engine = create_engine(DATABASE_URL)
+# Connection pool tuning (shared by the sync and async engines)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "50"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+engine = create_engine(DATABASE_URL, **pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for the message processor, so DB calls don't block its event loop.
+# The sync engine above stays for create_tables(), migrations and the sync callers.
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# Status vocabularies, stored as SMALLINT codes (the position in each tuple).
+# Only append new values so existing codes keep their meaning.
+PROCESSED_STATUSES = (
+    "pending", "processed", "processed_ignore", "processed_notify",
+    "processed_respond", "completed", "failed", "ignored", "in_progress",
+)
+SLACK_RESPONDED_STATUSES = ("no", "yes", "failed")
+CLASSIFICATIONS = ("ignore", "notify", "respond")
+
+class SmallEnum(TypeDecorator):
+    """String vocabulary stored as a SMALLINT code"""
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values: tuple):
+        super().__init__()
+        self.values = values
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self.values.index(value)
+        except ValueError:
+            raise ValueError(f"{value!r} is not one of {self.values}")
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.values[value]
+
+    def code(self, value: str) -> int:
+        """SMALLINT code for value, for raw SQL such as index predicates"""
+        return self.values.index(value)
+
+ProcessedStatus = SmallEnum(PROCESSED_STATUSES)
+SlackRespondedStatus = SmallEnum(SLACK_RESPONDED_STATUSES)
+Classification = SmallEnum(CLASSIFICATIONS)
+
 # SQLAlchemy Model
 class SlackMessage(Base):
     __tablename__ = "slack_messages"
+    __table_args__ = (
+        # Identifies a Slack event; lets inserts dedupe with ON CONFLICT DO NOTHING
+        UniqueConstraint("envelope_id", "channel", "user", "ts", name="uq_slack_msg"),
+        # Partial indexes backing get_pending_messages / get_messages_needing_slack_response
+        Index(
+            "ix_pending", "processed",
+            postgresql_where=sql_text(f"processed = {ProcessedStatus.code('pending')}"),
+        ),
+        Index(
+            "ix_notify_unsent", "classification", "slack_responded",
+            postgresql_where=sql_text(
+                f"classification = {Classification.code('notify')} "
+                f"AND slack_responded = {SlackRespondedStatus.code('no')}"
+            ),
+        ),
+        # Backs delete_old_messages
+        Index("ix_created_at", "created_at"),
+        # Lets the claim find in_progress rows whose lease ran out
+        Index(
+            "ix_in_progress_claimed_at", "claimed_at",
+            postgresql_where=sql_text(f"processed = {ProcessedStatus.code('in_progress')}"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     envelope_id = Column(String, nullable=False)
@@ -32,276 +119,469 @@ class SlackMessage(Base):
     text = Column(Text, nullable=False)
     ts = Column(String, nullable=False)
     thread_ts = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    processed = Column(String, default="pending")  # pending, processed, ignored
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed = Column(ProcessedStatus, default="pending")  # see PROCESSED_STATUSES
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # when a processor took it in_progress
     
     # API processing results
     api_thread_id = Column(String, nullable=True)
     api_message_id = Column(String, nullable=True)
-    classification = Column(String, nullable=True)  # ignore, notify, respond
+    classification = Column(Classification, nullable=True)  # ignore, notify, respond
     reasoning = Column(Text, nullable=True)
     notification_message = Column(Text, nullable=True)
-    events_data = Column(Text, nullable=True)  # JSON string of events
-    processed_at = Column(DateTime, nullable=True)
+    events_data = Column(JSONB, nullable=True)  # Graph events
+    processed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Slack response tracking
-    slack_responded = Column(String, default="no")  # no, yes, failed
-    slack_responded_at = Column(DateTime, nullable=True)
+    slack_responded = Column(SlackRespondedStatus, default="no")  # no, yes, failed
+    slack_responded_at = Column(DateTime(timezone=True), nullable=True)
     slack_response_text = Column(Text, nullable=True)  # Actual response sent to Slack
 
 # Create tables
 def create_tables():
     """Create all tables in the database"""
     Base.metadata.create_all(bind=engine)
-    print(f"✅ Database tables created successfully")
+    logger.info("✅ Database tables created successfully")
+
+def init_db():
+    """Create any missing tables once at service startup (no longer done on import)"""
+    create_tables()
 
 def get_db():
     """Get database session"""
-    db = SessionLocal()
-    try:
+    with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Postgres channel notified whenever new pending messages are committed
+PENDING_MESSAGES_CHANNEL = "pending_msg"
+notify_pending_messages = sql_text(f"NOTIFY {PENDING_MESSAGES_CHANNEL}")
 
 def save_message_to_db(envelope_id: str, channel: str, user: str, text: str, ts: str, thread_ts: str = None):
     """Save message to PostgreSQL database"""
     try:
-        db = SessionLocal()
-        
-        # Check if message already exists
-        existing_message = db.query(SlackMessage).filter(
-            SlackMessage.envelope_id == envelope_id,
-            SlackMessage.channel == channel,
-            SlackMessage.user == user,
-            SlackMessage.ts == ts
-        ).first()
-        
-        if existing_message:
-            print(f"🔄 Message already exists in DB: {envelope_id}")
-            return existing_message.id
+        with SessionLocal.begin() as db:
+            # Insert and dedupe in one statement; RETURNING is empty if the message exists
+            stmt = insert(SlackMessage).values(
+                envelope_id=envelope_id,
+                channel=channel,
+                user=user,
+                text=text,
+                ts=ts,
+                thread_ts=thread_ts,
+                processed="pending"
+            ).on_conflict_do_nothing(
+                index_elements=["envelope_id", "channel", "user", "ts"]
+            ).returning(SlackMessage.id)
+            row = db.execute(stmt).first()
+            
+            if row is not None:
+                # Delivered to listening processors when the transaction commits
+                db.execute(notify_pending_messages)
+            else:
+                existing_id = db.execute(select(SlackMessage.id).where(
+                    SlackMessage.envelope_id == envelope_id,
+                    SlackMessage.channel == channel,
+                    SlackMessage.user == user,
+                    SlackMessage.ts == ts
+                )).scalar()
+                logger.info("🔄 Message already exists in DB: %s", envelope_id)
+                return existing_id
         
-        # Create new message record
-        new_message = SlackMessage(
-            envelope_id=envelope_id,
-            channel=channel,
-            user=user,
-            text=text,
-            ts=ts,
-            thread_ts=thread_ts,
-            processed="pending"
-        )
+        logger.debug("✅ Message saved to DB with ID: %s", row.id)
+        return row.id
         
-        db.add(new_message)
-        db.commit()
-        db.refresh(new_message)
+    except Exception as e:
+        logger.error("❌ Error saving message to DB: %s", e)
+        return None
+
+# Rows per INSERT statement; Postgres gains little from larger batches
+BULK_INSERT_BATCH_SIZE = 1000
+
+def save_messages_bulk(rows: list[dict]):
+    """Insert many messages in batched statements, skipping ones already stored"""
+    try:
+        inserted = 0
+        with SessionLocal.begin() as db:
+            for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+                chunk = rows[start:start + BULK_INSERT_BATCH_SIZE]
+                stmt = insert(SlackMessage).values(
+                    [{"thread_ts": None, **row, "processed": "pending"} for row in chunk]
+                ).on_conflict_do_nothing(
+                    index_elements=["envelope_id", "channel", "user", "ts"]
+                ).returning(SlackMessage.id)
+                inserted += len(db.execute(stmt).all())
+            if inserted:
+                db.execute(notify_pending_messages)
         
-        print(f"✅ Message saved to DB with ID: {new_message.id}")
-        return new_message.id
+        logger.debug("✅ Saved %s of %s messages to DB (%s already existed)", inserted, len(rows), len(rows) - inserted)
+        return inserted
         
     except Exception as e:
-        print(f"❌ Error saving message to DB: {e}")
-        db.rollback()
+        logger.error("❌ Error bulk saving messages to DB: %s", e)
         return None
-    finally:
-        db.close()
 
-def get_pending_messages():
-    """Get all pending messages from database"""
+# Hot-path statements are built once; callers only bind parameters per call
+pending_messages_query = select(
+    SlackMessage.id,
+    SlackMessage.channel,
+    SlackMessage.user,
+    SlackMessage.text,
+    SlackMessage.ts,
+    SlackMessage.thread_ts,
+).where(SlackMessage.processed == "pending")
+
+pending_messages_batch_query = pending_messages_query.order_by(SlackMessage.id).limit(
+    bindparam("batch_size", type_=Integer)
+)
+
+# A claim is a lease: in_progress rows older than this are assumed to belong to a
+# processor that died between the claim and the status update, and are claimed again
+CLAIM_LEASE_MINUTES = int(os.getenv("CLAIM_LEASE_MINUTES", "15"))
+
+# Claim the oldest pending (or lease-expired) ids; SKIP LOCKED lets concurrent workers take disjoint batches
+claim_pending_messages_stmt = (
+    update(SlackMessage)
+    .where(SlackMessage.id.in_(
+        select(SlackMessage.id)
+        .where(or_(
+            SlackMessage.processed == "pending",
+            and_(
+                SlackMessage.processed == "in_progress",
+                SlackMessage.claimed_at < func.now() - timedelta(minutes=CLAIM_LEASE_MINUTES),
+            ),
+        ))
+        .order_by(SlackMessage.id)
+        .limit(bindparam("batch_size", type_=Integer))
+        .with_for_update(skip_locked=True)
+    ))
+    .values(processed="in_progress", claimed_at=func.now())
+    .returning(*pending_messages_query.selected_columns)
+)
+
+update_message_status_stmt = (
+    update(SlackMessage)
+    .where(SlackMessage.id == bindparam("message_id", type_=Integer))
+    .values(processed=bindparam("status", type_=ProcessedStatus))
+    .returning(SlackMessage.id)
+)
+
+def get_pending_messages(batch_size: int = 100):
+    """Get the oldest pending messages from database"""
     try:
-        db = SessionLocal()
-        messages = db.query(SlackMessage).filter(SlackMessage.processed == "pending").all()
-        print(f"🔍 Found {len(messages)} pending messages")
+        with SessionLocal() as db:
+            messages = db.execute(
+                pending_messages_batch_query,
+                {"batch_size": batch_size},
+                execution_options={"yield_per": batch_size},
+            ).all()
+        logger.info("🔍 Found %s pending messages", len(messages))
         return messages
     except Exception as e:
-        print(f"❌ Error getting pending messages: {e}")
+        logger.error("❌ Error getting pending messages: %s", e)
         return []
-    finally:
-        db.close()
 
 def get_messages_needing_slack_response():
     """Get messages that need Slack responses (notify classification but no response sent)"""
     try:
-        db = SessionLocal()
-        messages = db.query(SlackMessage).filter(
-            SlackMessage.classification == "notify",
-            SlackMessage.slack_responded == "no"
-        ).all()
+        with SessionLocal() as db:
+            messages = db.query(SlackMessage).filter(
+                SlackMessage.classification == "notify",
+                SlackMessage.slack_responded == "no"
+            ).all()
+            db.expunge_all()
         return messages
     except Exception as e:
-        print(f"❌ Error getting messages needing Slack response: {e}")
+        logger.error("❌ Error getting messages needing Slack response: %s", e)
         return []
-    finally:
-        db.close()
 
 def get_messages_needing_human_response():
     """Get messages that need human response (respond classification)"""
     try:
-        db = SessionLocal()
-        messages = db.query(SlackMessage).filter(
-            SlackMessage.classification == "respond"
-        ).all()
+        with SessionLocal() as db:
+            messages = db.query(SlackMessage).filter(
+                SlackMessage.classification == "respond"
+            ).all()
+            db.expunge_all()
         return messages
     except Exception as e:
-        print(f"❌ Error getting messages needing human response: {e}")
+        logger.error("❌ Error getting messages needing human response: %s", e)
         return []
-    finally:
-        db.close()
 
 def update_message_status(message_id: int, status: str):
     """Update message processing status"""
     try:
-        db = SessionLocal()
-        message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
-        if message:
-            message.processed = status
-            db.commit()
-            print(f"✅ Message {message_id} status updated to: {status}")
-            return True
-        else:
-            print(f"❌ Message {message_id} not found")
+        with SessionLocal.begin() as db:
+            updated = db.execute(
+                update_message_status_stmt, {"message_id": message_id, "status": status}
+            ).first()
+        if updated is None:
+            logger.warning("❌ Message %s not found", message_id)
             return False
+        logger.debug("✅ Message %s status updated to: %s", message_id, status)
+        return True
     except Exception as e:
-        print(f"❌ Error updating message status: {e}")
-        db.rollback()
+        logger.error("❌ Error updating message status: %s", e)
         return False
-    finally:
-        db.close()
 
-def update_processing_results(message_id: int, api_result: dict):
+@dataclass(slots=True)
+class ParsedEvents:
+    """Fields the processor and DB layer read out of a run's graph events"""
+    classification: str = None
+    reasoning: str = None
+    notification_message: str = None
+
+def _parse_classify(data: dict, parsed: ParsedEvents):
+    parsed.classification = data.get('classification')
+    parsed.reasoning = data.get('reasoning')
+
+def _parse_decision(data: dict, parsed: ParsedEvents):
+    # classify_message is authoritative; decision_maker only echoes it
+    if parsed.classification is None:
+        parsed.classification = data.get('classification')
+
+def _parse_notification(data: dict, parsed: ParsedEvents):
+    parsed.notification_message = data.get('notification_message')
+
+# Graph node name -> handler for that node's update
+EVENT_HANDLERS = {
+    'classify_message': _parse_classify,
+    'decision_maker': _parse_decision,
+    'ai_notification': _parse_notification,
+}
+
+def parse_events(events: list) -> ParsedEvents:
+    """Extract classification, reasoning and notification message from graph events in one pass"""
+    parsed = ParsedEvents()
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        for node, data in event.items():
+            handler = EVENT_HANDLERS.get(node)
+            if handler is not None and isinstance(data, dict):
+                handler(data, parsed)
+    return parsed
+
+def apply_processing_results(message: SlackMessage, api_result: dict, parsed: ParsedEvents = None):
+    """Copy API processing results onto a message row"""
+    events = api_result.get("events", [])
+    if parsed is None:
+        parsed = parse_events(events)
+    
+    # Extract data from API result
+    message.api_thread_id = api_result.get("thread_id")
+    message.api_message_id = api_result.get("message_id")
+    message.events_data = events
+    message.processed_at = func.now()
+    
+    # Classification and other data parsed from events
+    for field in ParsedEvents.__slots__:
+        value = getattr(parsed, field)
+        if value is not None:
+            setattr(message, field, value)
+    
+    # Update status based on classification
+    if message.classification:
+        message.processed = f"processed_{message.classification}"
+    else:
+        message.processed = "processed"
+
+def update_processing_results(message_id: int, api_result: dict, parsed: ParsedEvents = None):
     """Update message with API processing results"""
     try:
-        db = SessionLocal()
-        message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
+        with SessionLocal.begin() as db:
+            message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
+            if not message:
+                logger.warning("❌ Message %s not found", message_id)
+                return False
+            apply_processing_results(message, api_result, parsed)
+        logger.debug("✅ Processing results updated for message %s", message_id)
+        return True
         
-        if message:
-            # Extract data from API result
-            message.api_thread_id = api_result.get("thread_id")
-            message.api_message_id = api_result.get("message_id")
-            message.events_data = json.dumps(api_result.get("events", []))
-            message.processed_at = datetime.utcnow()
-            
-            # Extract classification and other data from events
-            events = api_result.get("events", [])
-            for event in events:
-                if isinstance(event, dict):
-                    if 'classify_message' in event:
-                        classify_data = event['classify_message']
-                        if isinstance(classify_data, dict):
-                            message.classification = classify_data.get('classification')
-                            message.reasoning = classify_data.get('reasoning')
-                    elif 'ai_notification' in event:
-                        notification_data = event['ai_notification']
-                        if isinstance(notification_data, dict):
-                            message.notification_message = notification_data.get('notification_message')
-            
-            # Update status based on classification
-            if message.classification:
-                message.processed = f"processed_{message.classification}"
-            else:
-                message.processed = "processed"
-            
-            db.commit()
-            print(f"✅ Processing results updated for message {message_id}")
-            return True
-        else:
-            print(f"❌ Message {message_id} not found")
-            return False
-            
     except Exception as e:
-        print(f"❌ Error updating processing results: {e}")
-        db.rollback()
+        logger.error("❌ Error updating processing results: %s", e)
         return False
-    finally:
-        db.close()
+
+def slack_response_values(status: str, response_text: str = None) -> dict:
+    """Column values for a Slack response status (and text) update"""
+    values = {"slack_responded": status}
+    if status == "yes":
+        values["slack_responded_at"] = func.now()
+    if response_text:
+        values["slack_response_text"] = response_text
+    return values
 
 def update_slack_response_status(message_id: int, status: str, response_text: str = None):
     """Update Slack response status and text for a message"""
     try:
-        db = SessionLocal()
-        message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
-        
-        if message:
-            message.slack_responded = status
-            if status == "yes":
-                message.slack_responded_at = datetime.utcnow()
-            if response_text:
-                message.slack_response_text = response_text
-            db.commit()
-            print(f"✅ Slack response status updated for message {message_id}: {status}")
-            return True
-        else:
-            print(f"❌ Message {message_id} not found")
+        with SessionLocal.begin() as db:
+            # Single UPDATE ... RETURNING instead of SELECT + ORM update
+            updated = db.execute(
+                update(SlackMessage)
+                .where(SlackMessage.id == message_id)
+                .values(**slack_response_values(status, response_text))
+                .returning(SlackMessage.id)
+            ).first()
+        if updated is None:
+            logger.warning("❌ Message %s not found", message_id)
             return False
+        logger.debug("✅ Slack response status updated for message %s: %s", message_id, status)
+        return True
             
     except Exception as e:
-        print(f"❌ Error updating Slack response status: {e}")
-        db.rollback()
+        logger.error("❌ Error updating Slack response status: %s", e)
         return False
-    finally:
-        db.close()
 
 def update_human_feedback(message_id: int, human_feedback: str, human_slack_response: str):
     """Update message with human feedback and response"""
     try:
-        db = SessionLocal()
-        message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
-        
-        if message:
-            # Store human's feedback and response
-            message.notification_message = human_slack_response  # Override AI response with human's
-            message.reasoning = human_feedback  # Store human's analysis
-            message.processed = "completed"  # Mark as completed
-            message.slack_responded = "yes"  # Mark as responded
-            message.slack_responded_at = datetime.utcnow()
-            
-            db.commit()
-            print(f"✅ Human feedback updated for message {message_id}")
-            print(f"   Feedback: {human_feedback[:50]}...")
-            print(f"   Slack Response: {human_slack_response}")
-            return True
-        else:
-            print(f"❌ Message {message_id} not found")
+        with SessionLocal.begin() as db:
+            # Store human's feedback and response in one UPDATE ... RETURNING
+            updated = db.execute(
+                update(SlackMessage)
+                .where(SlackMessage.id == message_id)
+                .values(
+                    notification_message=human_slack_response,  # Override AI response with human's
+                    reasoning=human_feedback,  # Store human's analysis
+                    processed="completed",  # Mark as completed
+                    slack_responded="yes",  # Mark as responded
+                    slack_responded_at=func.now(),
+                )
+                .returning(SlackMessage.id)
+            ).first()
+        if updated is None:
+            logger.warning("❌ Message %s not found", message_id)
             return False
-            
+        
+        logger.debug("✅ Human feedback updated for message %s", message_id)
+        logger.debug("   Feedback: %s...", human_feedback[:50])
+        logger.debug("   Slack Response: %s", human_slack_response)
+        return True
+        
     except Exception as e:
-        print(f"❌ Error updating human feedback: {e}")
-        db.rollback()
+        logger.error("❌ Error updating human feedback: %s", e)
         return False
-    finally:
-        db.close()
+
+def get_message_stats():
+    """Count messages per (classification, slack_responded) pair in one aggregate query"""
+    try:
+        with SessionLocal() as db:
+            rows = db.query(
+                SlackMessage.classification, SlackMessage.slack_responded, func.count()
+            ).group_by(SlackMessage.classification, SlackMessage.slack_responded).all()
+        return {(classification, slack_responded): count for classification, slack_responded, count in rows}
+    except Exception as e:
+        logger.error("❌ Error getting message stats: %s", e)
+        return {}
 
 def get_message_by_id(message_id: int):
     """Get message by ID"""
     try:
-        db = SessionLocal()
-        message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
+        with SessionLocal() as db:
+            message = db.query(SlackMessage).filter(SlackMessage.id == message_id).first()
+            db.expunge_all()
         return message
     except Exception as e:
-        print(f"❌ Error getting message by ID: {e}")
+        logger.error("❌ Error getting message by ID: %s", e)
         return None
-    finally:
-        db.close()
 
 def delete_old_messages(days_old: int = 30):
     """Delete messages older than specified days"""
     try:
-        db = SessionLocal()
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-        deleted_count = db.query(SlackMessage).filter(SlackMessage.created_at < cutoff_date).delete()
-        db.commit()
-        print(f"✅ Deleted {deleted_count} messages older than {days_old} days")
+        cutoff_date = func.now() - timedelta(days=days_old)
+        with SessionLocal.begin() as db:
+            deleted_count = db.query(SlackMessage).filter(SlackMessage.created_at < cutoff_date).delete()
+        logger.debug("✅ Deleted %s messages older than %s days", deleted_count, days_old)
         return deleted_count
     except Exception as e:
-        print(f"❌ Error deleting old messages: {e}")
-        db.rollback()
+        logger.error("❌ Error deleting old messages: %s", e)
         return 0
-    finally:
-        db.close()
 
-# Initialize database when module is imported
+# Async helpers used by the message processor
+
+async def listen_for_pending_messages(on_notify, on_terminate=None):
+    """Open a dedicated connection that calls on_notify() when new pending messages are committed.
+
+    on_terminate() is called if the connection is closed, e.g. by a Postgres restart.
+    """
+    try:
+        connection = await asyncpg.connect(DATABASE_URL)
+        await connection.add_listener(PENDING_MESSAGES_CHANNEL, lambda *args: on_notify())
+        if on_terminate is not None:
+            connection.add_termination_listener(lambda *args: on_terminate())
+        logger.info("👂 Listening for new messages on '%s'", PENDING_MESSAGES_CHANNEL)
+        return connection
+    except Exception as e:
+        logger.error("❌ Error listening for pending messages: %s", e)
+        return None
+
+async def claim_pending_messages_async(batch_size: int = 100):
+    """Atomically mark up to batch_size pending (or lease-expired) messages in_progress and return them"""
+    try:
+        async with AsyncSessionLocal() as db:
+            messages = (await db.execute(claim_pending_messages_stmt, {"batch_size": batch_size})).all()
+            await db.commit()
+        logger.info("🔍 Claimed %s pending messages", len(messages))
+        return sorted(messages, key=lambda message: message.id)
+    except Exception as e:
+        logger.error("❌ Error claiming pending messages: %s", e)
+        return []
+
+async def update_message_status_async(message_id: int, status: str):
+    """Update message processing status without blocking the event loop"""
+    try:
+        async with AsyncSessionLocal() as db:
+            updated = (await db.execute(
+                update_message_status_stmt, {"message_id": message_id, "status": status}
+            )).first()
+            await db.commit()
+        if updated is None:
+            logger.warning("❌ Message %s not found", message_id)
+            return False
+        logger.debug("✅ Message %s status updated to: %s", message_id, status)
+        return True
+    except Exception as e:
+        logger.error("❌ Error updating message status: %s", e)
+        return False
+
+async def update_processing_results_async(message_id: int, api_result: dict, parsed: ParsedEvents = None):
+    """Update message with API processing results without blocking the event loop"""
+    try:
+        async with AsyncSessionLocal() as db:
+            message = await db.get(SlackMessage, message_id)
+            if message:
+                apply_processing_results(message, api_result, parsed)
+                await db.commit()
+                logger.debug("✅ Processing results updated for message %s", message_id)
+                return True
+            else:
+                logger.warning("❌ Message %s not found", message_id)
+                return False
+    except Exception as e:
+        logger.error("❌ Error updating processing results: %s", e)
+        return False
+
+async def update_slack_response_status_async(message_id: int, status: str, response_text: str = None):
+    """Update Slack response status and text without blocking the event loop"""
+    try:
+        async with AsyncSessionLocal() as db:
+            updated = (await db.execute(
+                update(SlackMessage)
+                .where(SlackMessage.id == message_id)
+                .values(**slack_response_values(status, response_text))
+                .returning(SlackMessage.id)
+            )).first()
+            await db.commit()
+        if updated is None:
+            logger.warning("❌ Message %s not found", message_id)
+            return False
+        logger.debug("✅ Slack response status updated for message %s: %s", message_id, status)
+        return True
+    except Exception as e:
+        logger.error("❌ Error updating Slack response status: %s", e)
+        return False
+
+# Initialize database when run directly (services call init_db() at startup)
 if __name__ == "__main__":
-    create_tables()
+    init_db()
     print(f"🗄️  Database URL: {DATABASE_URL}")
-else:
-    # Create tables when module is imported
-    create_tables() 
\ No newline at end of file
+ 
\ No newline at end of file
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the claimed_at lease column to existing databases
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine, ProcessedStatus
+
+def migrate_add_claimed_at():
+    """Add claimed_at to slack_messages and index the in_progress rows by it"""
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("""
+                ALTER TABLE slack_messages 
+                ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE
+            """))
+            print("✅ Column 'claimed_at' is in place")
+            
+            # Rows claimed before this column existed have no lease; release them now
+            released = connection.execute(text(f"""
+                UPDATE slack_messages 
+                SET processed = {ProcessedStatus.code('pending')} 
+                WHERE processed = {ProcessedStatus.code('in_progress')} 
+                AND claimed_at IS NULL
+            """)).rowcount
+            print(f"✅ Released {released} in_progress messages without a lease")
+            
+            connection.execute(text(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_in_progress_claimed_at 
+                ON slack_messages (claimed_at) 
+                WHERE processed = {ProcessedStatus.code('in_progress')}
+            """))
+            print("✅ Index 'ix_in_progress_claimed_at' is in place")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error adding claimed_at: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to add the claimed_at lease column...")
+    success = migrate_add_claimed_at()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the hot-query indexes to existing databases
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine, ProcessedStatus, SlackRespondedStatus, Classification
+
+INDEXES = {
+    "ix_pending": f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pending 
+        ON slack_messages (processed) 
+        WHERE processed = {ProcessedStatus.code('pending')}
+    """,
+    "ix_notify_unsent": f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notify_unsent 
+        ON slack_messages (classification, slack_responded) 
+        WHERE classification = {Classification.code('notify')} 
+        AND slack_responded = {SlackRespondedStatus.code('no')}
+    """,
+    "ix_created_at": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_created_at 
+        ON slack_messages (created_at)
+    """,
+}
+
+def migrate_add_query_indexes():
+    """Create the slack_messages query indexes without locking out writes"""
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for name, statement in INDEXES.items():
+                connection.execute(text(statement))
+                print(f"✅ Index '{name}' is in place")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error creating indexes: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to add query indexes...")
+    success = migrate_add_query_indexes()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration script to add a trigram index for the dashboard's text search
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine
+
+def migrate_add_text_trgm_index():
+    """Index slack_messages.text with pg_trgm so ILIKE '%term%' can skip a sequential scan"""
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            print("✅ Extension 'pg_trgm' is in place")
+            
+            connection.execute(text("""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_text_trgm 
+                ON slack_messages USING gin (text gin_trgm_ops)
+            """))
+            print("✅ Index 'ix_text_trgm' is in place")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error creating trigram index: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to add the text trigram index...")
+    success = migrate_add_text_trgm_index()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
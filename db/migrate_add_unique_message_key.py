@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the uq_slack_msg unique constraint to existing databases
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine
+
+def migrate_add_unique_message_key():
+    """Add a unique constraint on (envelope_id, channel, user, ts) to slack_messages"""
+    try:
+        with engine.begin() as connection:
+            # Check if constraint already exists
+            result = connection.execute(text("""
+                SELECT constraint_name 
+                FROM information_schema.table_constraints 
+                WHERE table_name = 'slack_messages' 
+                AND constraint_name = 'uq_slack_msg'
+            """))
+            
+            if result.fetchone():
+                print("✅ Constraint 'uq_slack_msg' already exists")
+                return True
+            
+            # Add the new constraint (fails if duplicate rows are already stored)
+            connection.execute(text("""
+                ALTER TABLE slack_messages 
+                ADD CONSTRAINT uq_slack_msg UNIQUE (envelope_id, channel, "user", ts)
+            """))
+        
+        print("✅ Successfully added 'uq_slack_msg' constraint to slack_messages table")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error adding constraint: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to add uq_slack_msg constraint...")
+    success = migrate_add_unique_message_key()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
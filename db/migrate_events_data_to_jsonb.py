@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert the events_data column to JSONB
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine
+
+def migrate_events_data_to_jsonb():
+    """Convert slack_messages.events_data from a JSON string to JSONB"""
+    try:
+        with engine.begin() as connection:
+            # Check if column is already converted
+            result = connection.execute(text("""
+                SELECT data_type 
+                FROM information_schema.columns 
+                WHERE table_name = 'slack_messages' 
+                AND column_name = 'events_data'
+            """))
+            
+            if result.scalar() == "jsonb":
+                print("✅ Column 'events_data' is already JSONB")
+                return True
+            
+            connection.execute(text("""
+                ALTER TABLE slack_messages 
+                ALTER COLUMN events_data TYPE JSONB 
+                USING events_data::jsonb
+            """))
+        
+        print("✅ Successfully converted 'events_data' column to JSONB")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error converting column: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to convert events_data to JSONB...")
+    success = migrate_events_data_to_jsonb()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert the processed/classification/slack_responded columns to SMALLINT codes
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine, PROCESSED_STATUSES, SLACK_RESPONDED_STATUSES, CLASSIFICATIONS
+
+COLUMNS = {
+    "processed": PROCESSED_STATUSES,
+    "classification": CLASSIFICATIONS,
+    "slack_responded": SLACK_RESPONDED_STATUSES,
+}
+
+def case_expression(column: str, values: tuple) -> str:
+    """SQL CASE mapping each string value of column to its SMALLINT code"""
+    whens = " ".join(f"WHEN '{value}' THEN {code}" for code, value in enumerate(values))
+    return f"CASE {column} {whens} END"
+
+def migrate_status_columns_to_smallint():
+    """Rewrite the status columns of slack_messages as SMALLINT codes"""
+    try:
+        with engine.begin() as connection:
+            for column, values in COLUMNS.items():
+                # Check if column is already converted
+                result = connection.execute(text("""
+                    SELECT data_type 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'slack_messages' 
+                    AND column_name = :column
+                """), {"column": column})
+                
+                if result.scalar() == "smallint":
+                    print(f"✅ Column '{column}' is already SMALLINT")
+                    continue
+                
+                # Refuse to convert values the SMALLINT mapping doesn't know about
+                known = ", ".join(f"'{value}'" for value in values)
+                unknown = connection.execute(text(f"""
+                    SELECT DISTINCT {column} FROM slack_messages 
+                    WHERE {column} IS NOT NULL AND {column} NOT IN ({known})
+                """)).scalars().all()
+                if unknown:
+                    raise ValueError(f"Column '{column}' has unmapped values: {unknown}")
+                
+                # The partial indexes compare against the old string values
+                connection.execute(text("DROP INDEX IF EXISTS ix_pending"))
+                connection.execute(text("DROP INDEX IF EXISTS ix_notify_unsent"))
+                
+                connection.execute(text(f"""
+                    ALTER TABLE slack_messages 
+                    ALTER COLUMN {column} TYPE SMALLINT 
+                    USING {case_expression(column, values)}
+                """))
+                print(f"✅ Converted column '{column}' to SMALLINT")
+        
+        print("ℹ️  Run migrate_add_query_indexes.py to recreate the partial indexes")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error converting status columns: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to convert status columns to SMALLINT...")
+    success = migrate_status_columns_to_smallint()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert the slack_messages timestamps to TIMESTAMP WITH TIME ZONE
+"""
+
+import sys
+import os
+from sqlalchemy import text
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import engine
+
+COLUMNS = ("created_at", "processed_at", "slack_responded_at")
+
+def migrate_timestamps_to_timestamptz():
+    """Reinterpret the stored naive UTC timestamps as timestamptz and default created_at to now()"""
+    try:
+        with engine.begin() as connection:
+            for column in COLUMNS:
+                # Check if column is already converted
+                result = connection.execute(text("""
+                    SELECT data_type 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'slack_messages' 
+                    AND column_name = :column
+                """), {"column": column})
+                
+                if result.scalar() == "timestamp with time zone":
+                    print(f"✅ Column '{column}' is already TIMESTAMPTZ")
+                    continue
+                
+                # Existing values were written with datetime.utcnow()
+                connection.execute(text(f"""
+                    ALTER TABLE slack_messages 
+                    ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE 
+                    USING {column} AT TIME ZONE 'UTC'
+                """))
+                print(f"✅ Converted column '{column}' to TIMESTAMPTZ")
+            
+            connection.execute(text("""
+                ALTER TABLE slack_messages 
+                ALTER COLUMN created_at SET DEFAULT now()
+            """))
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error converting timestamps: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running migration to convert timestamps to TIMESTAMPTZ...")
+    success = migrate_timestamps_to_timestamptz()
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
+        sys.exit(1)
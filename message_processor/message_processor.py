@@ -4,32 +4,59 @@ Message Processor - Reads pending messages from database and processes them usin
 """
 
 import os
-import time
-import requests
+import asyncio
+import logging
+import httpx
 import json
 from datetime import datetime
 from typing import Dict, Any, Optional
 from db.db import (
-    get_pending_messages, 
-    update_message_status, 
-    update_processing_results,
-    update_slack_response_status,
-    get_message_by_id,
+    claim_pending_messages_async,
+    listen_for_pending_messages,
+    parse_events,
+    update_message_status_async,
+    update_processing_results_async,
+    update_slack_response_status_async,
+    init_db,
+    async_engine,
     DATABASE_URL
 )
+from api.ndjson import read_ndjson
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # API Configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8002")
+API_TIMEOUT_SECONDS = float(os.getenv("API_TIMEOUT_SECONDS", "30"))
+# Maximum API requests in flight at once (replaces the old per-message sleep)
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "10"))
+# Coroutines processing claimed batches concurrently
+PROCESSOR_CONSUMERS = int(os.getenv("PROCESSOR_CONSUMERS", "4"))
+# While LISTENing for new messages, still poll this often as a safety net
+PENDING_POLL_FALLBACK_SECONDS = float(os.getenv("PENDING_POLL_FALLBACK_SECONDS", "300"))
 
 class MessageProcessor:
     def __init__(self):
         self.api_base_url = API_BASE_URL
-        print(f"🤖 Message Processor initialized")
-        print(f"🔗 API Base URL: {self.api_base_url}")
-        print(f"🗄️  Database: {DATABASE_URL}")
+        # One pooled client so requests reuse keep-alive connections to the API,
+        # and retry failed connection attempts
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(API_TIMEOUT_SECONDS, connect=3.0),
+            transport=httpx.AsyncHTTPTransport(
+                retries=3,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            ),
+        )
+        self._api_semaphore = asyncio.Semaphore(API_MAX_CONCURRENCY)
+        self._wakeup = asyncio.Event()
+        self._listener = None
+        self._listening = False
+        logger.info("🤖 Message Processor initialized")
+        logger.info("🔗 API Base URL: %s", self.api_base_url)
+        logger.info("🗄️  Database: %s", DATABASE_URL)
     
     def format_input_for_api(self, message) -> str:
         """Format message data for API input (channel|user|text)"""
@@ -46,93 +73,80 @@ class MessageProcessor:
             "slack_text": message.text
         }
     
-    def call_api_for_processing(self, message) -> Optional[Dict[str, Any]]:
+    async def call_api_for_processing(self, message) -> Optional[Dict[str, Any]]:
         """Call the API to process the message"""
         try:
             request_data = self.prepare_api_request(message)
             
-            print(f"📡 Calling API for message {message.id}")
-            print(f"   Input: {request_data['input']}")
+            logger.info("📡 Calling API for message %s", message.id)
+            logger.debug("   Input: %s", request_data['input'])
             
-            response = requests.post(f"{self.api_base_url}/start", json=request_data)
+            # /start streams NDJSON; collect it back into a single result dict
+            async with self._api_semaphore, self._http.stream(
+                "POST", f"{self.api_base_url}/start", json=request_data
+            ) as response:
+                if response.status_code == 200:
+                    lines = [line async for line in response.aiter_lines()]
+                else:
+                    await response.aread()
             
             if response.status_code == 200:
-                result = response.json()
-                print(f"✅ API processing successful")
-                print(f"   Thread ID: {result.get('thread_id')}")
-                print(f"   Message ID: {result.get('message_id')}")
+                result = read_ndjson(lines)
+                if result.get("status") == "error":
+                    logger.error("❌ Graph execution failed: %s", result.get('error'))
+                else:
+                    logger.info("✅ API processing successful")
+                logger.debug("   Thread ID: %s", result.get('thread_id'))
+                logger.debug("   Message ID: %s", result.get('message_id'))
                 return result
             else:
-                print(f"❌ API call failed: {response.status_code}")
-                print(f"   Response: {response.text}")
+                logger.error("❌ API call failed: %s", response.status_code)
+                logger.error("   Response: %s", response.text)
                 return None
                 
         except Exception as e:
-            print(f"❌ Error calling API: {e}")
+            logger.error("❌ Error calling API: %s", e)
             return None
     
-    def extract_classification_from_events(self, events: list) -> Optional[str]:
-        """Extract classification from API events"""
-        print("---events full---", events)
-        classification_type = None
-        
-        for event in events:
-            print("---event---", event)
-            try:
-                if isinstance(event, dict):
-                    if 'decision_maker' in event:
-                        if "classification" in event['decision_maker']:
-                            classification_type = event['decision_maker'].get('classification')
-                            break
-                    elif 'classify_message' in event:
-                        classify_data = event['classify_message']
-                        if isinstance(classify_data, dict) and "classification" in classify_data:
-                            classification_type = classify_data.get('classification')
-                            break
-                else:
-                    print("---event is not a dict---", event)
-                        
-            except (KeyError, AttributeError) as e:
-                print(f"⚠️  Could not parse event: {event}... Error: {e}")
-                continue
-        
-        print(f"---classification_type---: {classification_type}")
-        return classification_type
-    
-    def extract_notification_message_from_events(self, events: list) -> Optional[str]:
-        """Extract AI notification message from API events"""
-        print("---extracting notification from events---")
-        response_text = None
-        
-        for event in events:
-            print("---checking event for notification---", event)
-            try:
-                if isinstance(event, dict):
-                    if 'ai_notification' in event:
-                        notification_data = event['ai_notification']
-                        if isinstance(notification_data, dict) and "notification_message" in notification_data:
-                            response_text = notification_data.get('notification_message')
-                            print(f"---found notification message---: {response_text}")
-                            break
-                else:
-                    print("---event is not a dict for notification---", event)
-                        
-            except (KeyError, AttributeError) as e:
-                print(f"⚠️  Could not parse notification event: {event}... Error: {e}")
-                continue
-        
-        print(f"---response_text---: {response_text}")
-        return response_text
+    async def call_api_for_batch(self, messages: list) -> Optional[list]:
+        """Call the API to process several messages with one batched classification"""
+        try:
+            request_data = {"messages": [self.prepare_api_request(message) for message in messages]}
+            
+            logger.info("📡 Calling batch API for %s messages", len(messages))
+            
+            # The server runs every message's graph in this one request, so allow
+            # each of them the single-request read timeout
+            timeout = httpx.Timeout(API_TIMEOUT_SECONDS * len(messages), connect=3.0)
+            async with self._api_semaphore:
+                response = await self._http.post(
+                    f"{self.api_base_url}/start_batch", json=request_data, timeout=timeout
+                )
+            
+            if response.status_code == 200:
+                results = response.json().get("results", [])
+                if len(results) != len(messages):
+                    logger.error("❌ Batch API returned %s results for %s messages", len(results), len(messages))
+                    return None
+                logger.info("✅ Batch API processing successful")
+                return results
+            else:
+                logger.error("❌ Batch API call failed: %s", response.status_code)
+                logger.error("   Response: %s", response.text)
+                return None
+                
+        except httpx.ReadTimeout:
+            # The request was sent, so the server may have run (some of) the graphs;
+            # let the caller decide instead of treating this as a safe-to-retry failure
+            raise
+        except Exception as e:
+            logger.error("❌ Error calling batch API: %s", e)
+            return None
     
-    def send_notification_to_slack(self, message_id: int, notification_message: str) -> bool:
+    async def send_notification_to_slack(self, message, notification_message: str) -> bool:
         """Send notification message to Slack using the API's send_slack_response function"""
         try:
-            # Get message details from database
-            message = get_message_by_id(message_id)
-            if not message:
-                print(f"❌ Message {message_id} not found in database")
-                return False
-            
+            # The pending-batch row already carries channel/ts, so no re-fetch is needed
             # Prepare request to send Slack response
             slack_request = {
                 "channel": message.channel,
@@ -143,154 +157,236 @@ class MessageProcessor:
             if message.ts:
                 slack_request["thread_ts"] = message.ts
             
-            print(f"📡 Sending Slack notification:")
-            print(f"   Channel: {message.channel}")
-            print(f"   Message: {notification_message}")
-            print(f"   Thread TS: {message.thread_ts}")
+            logger.info("📡 Sending Slack notification:")
+            logger.debug("   Channel: %s", message.channel)
+            logger.debug("   Message: %s", notification_message)
+            logger.debug("   Thread TS: %s", message.thread_ts)
             
             # Call the API endpoint to send Slack response
-            response = requests.post(f"{self.api_base_url}/send_slack_response", json=slack_request)
+            async with self._api_semaphore:
+                response = await self._http.post(f"{self.api_base_url}/send_slack_response", json=slack_request)
             
             if response.status_code == 200:
                 result = response.json()
-                print(f"✅ Slack notification sent successfully")
+                logger.info("✅ Slack notification sent successfully")
                 # Update database to mark as responded and store the response text
-                update_slack_response_status(message_id, "yes", notification_message)
+                await update_slack_response_status_async(message.id, "yes", notification_message)
                 return True
             else:
-                print(f"❌ Failed to send Slack notification: {response.status_code}")
-                print(f"   Response: {response.text}")
+                logger.error("❌ Failed to send Slack notification: %s", response.status_code)
+                logger.error("   Response: %s", response.text)
                 # Update database to mark as failed
-                update_slack_response_status(message_id, "failed")
+                await update_slack_response_status_async(message.id, "failed")
                 return False
                 
         except Exception as e:
-            print(f"❌ Error sending Slack notification: {e}")
+            logger.error("❌ Error sending Slack notification: %s", e)
             return False
     
-    def store_processing_results(self, message_id: int, api_result: Dict[str, Any]) -> bool:
+    async def store_processing_results(self, message, api_result: Dict[str, Any]) -> bool:
         """Store API processing results in database"""
         try:
-            # Extract classification and notification message
-            events = api_result.get("events", [])
-            classification = self.extract_classification_from_events(events)
-            response_text = self.extract_notification_message_from_events(events)
+            message_id = message.id
+            # Extract classification and notification message in one pass over the events
+            parsed = parse_events(api_result.get("events", []))
+            classification = parsed.classification
+            response_text = parsed.notification_message
             
             # Use the new database function to store all results
-            success = update_processing_results(message_id, api_result)
+            success = await update_processing_results_async(message_id, api_result, parsed)
             
             if success:
                 thread_id = api_result.get("thread_id")
                 api_message_id = api_result.get("message_id")
                 
-                print(f"✅ Processing results stored for message {message_id}")
-                print(f"   Classification: {classification}")
-                print(f"   Response Text: {response_text}")
-                print(f"   Thread ID: {thread_id}")
-                print(f"   API Message ID: {api_message_id}")
+                logger.info("✅ Processing results stored for message %s", message_id)
+                logger.debug("   Classification: %s", classification)
+                logger.debug("   Response Text: %s", response_text)
+                logger.debug("   Thread ID: %s", thread_id)
+                logger.debug("   API Message ID: %s", api_message_id)
                 
                 # If classification is 'notify' and we have a response text, send to Slack
                 if classification == "notify" and response_text:
-                    print(f"🔔 Sending notification to Slack for message {message_id}")
-                    slack_success = self.send_notification_to_slack(message_id, response_text)
+                    logger.info("🔔 Sending notification to Slack for message %s", message_id)
+                    slack_success = await self.send_notification_to_slack(message, response_text)
                     if slack_success:
-                        print(f"✅ Notification sent to Slack successfully")
+                        logger.info("✅ Notification sent to Slack successfully")
                     else:
-                        print(f"❌ Failed to send notification to Slack")
+                        logger.error("❌ Failed to send notification to Slack")
             
             return success
             
         except Exception as e:
-            print(f"❌ Error storing processing results: {e}")
+            logger.error("❌ Error storing processing results: %s", e)
             return False
     
-    def process_single_message(self, message) -> bool:
+    async def process_single_message(self, message) -> bool:
         """Process a single pending message"""
-        print(f"\n🔄 Processing message {message.id}")
-        print(f"   Channel: {message.channel}")
-        print(f"   User: {message.user}")
-        print(f"   Text: {message.text[:50]}...")
+        logger.info("🔄 Processing message %s", message.id)
+        logger.debug("   Channel: %s", message.channel)
+        logger.debug("   User: %s", message.user)
+        logger.debug("   Text: %s...", message.text[:50])
         
         # Call API for processing
-        api_result = self.call_api_for_processing(message)
-        
+        api_result = await self.call_api_for_processing(message)
+        return await self.handle_api_result(message, api_result)
+    
+    async def handle_api_result(self, message, api_result: Optional[Dict[str, Any]]) -> bool:
+        """Store the API result for a message, or mark it failed"""
         if api_result:
             # Store results in database
-            success = self.store_processing_results(message.id, api_result)
+            success = await self.store_processing_results(message, api_result)
             
             if success:
-                print(f"✅ Message {message.id} processed successfully")
+                logger.info("✅ Message %s processed successfully", message.id)
                 return True
             else:
-                print(f"❌ Failed to store results for message {message.id}")
+                logger.error("❌ Failed to store results for message %s", message.id)
                 return False
         else:
-            print(f"❌ Failed to process message {message.id}")
+            logger.error("❌ Failed to process message %s", message.id)
             # Mark as failed
-            update_message_status(message.id, "failed")
+            await update_message_status_async(message.id, "failed")
             return False
     
-    def process_pending_messages(self, batch_size: int = 5) -> int:
-        """Process all pending messages in batches"""
-        print(f"\n🚀 Starting to process pending messages...")
-        
-        processed_count = 0
+    async def process_batch(self, batch: list) -> int:
+        """Process one claimed batch and return how many messages succeeded"""
+        logger.info("📦 Processing batch of %s messages...", len(batch))
         
-        while True:
-            # Get pending messages
-            pending_messages = get_pending_messages()
-            
-            if not pending_messages:
-                print(f"✅ No more pending messages to process")
-                break
-            
-            # Process batch
-            batch = pending_messages[:batch_size]
-            print(f"📦 Processing batch of {len(batch)} messages...")
-            
-            for message in batch:
-                success = self.process_single_message(message)
-                if success:
+        # Classify the whole batch in one API call, falling back to one call per message
+        try:
+            api_results = await self.call_api_for_batch(batch)
+        except httpx.ReadTimeout:
+            # Falling back would run every thread and notification a second time;
+            # the rows stay in_progress until their claim lease expires
+            logger.error("❌ Batch API timed out after the request was sent; leaving %s messages for re-claim", len(batch))
+            return 0
+        if api_results is not None:
+            processed_count = 0
+            for message, api_result in zip(batch, api_results):
+                if await self.handle_api_result(message, api_result):
                     processed_count += 1
-                
-                # Small delay between messages to avoid overwhelming the API
-                time.sleep(1)
-            
-            print(f"📊 Batch completed. Total processed: {processed_count}")
-            
-            # If we processed fewer than batch_size, we're done
-            if len(batch) < batch_size:
-                break
+            return processed_count
+        
+        # The API and DB calls are I/O bound, so run them concurrently
+        results = await asyncio.gather(
+            *[self.process_single_message(message) for message in batch]
+        )
+        return sum(1 for success in results if success)
+    
+    async def process_pending_messages(self, batch_size: int = 5, consumers: int = PROCESSOR_CONSUMERS) -> int:
+        """Process all pending messages, claiming batches ahead of the consumers working on them"""
+        logger.info("🚀 Starting to process pending messages...")
+        
+        # Bounded so the producer never claims far more than the consumers can take
+        queue = asyncio.Queue(maxsize=consumers * 2)
         
-        return processed_count
+        async def producer():
+            while True:
+                # Claim the next batch so other processors skip these messages
+                batch = await claim_pending_messages_async(batch_size)
+                if batch:
+                    await queue.put(batch)
+                # Fewer than batch_size means the backlog is drained
+                if len(batch) < batch_size:
+                    break
+            logger.info("✅ No more pending messages to process")
+            for _ in range(consumers):
+                await queue.put(None)
+        
+        async def consumer() -> int:
+            processed_count = 0
+            while (batch := await queue.get()) is not None:
+                processed_count += await self.process_batch(batch)
+                logger.info("📊 Batch completed. Processed by this consumer: %s", processed_count)
+            return processed_count
+        
+        _, *counts = await asyncio.gather(producer(), *[consumer() for _ in range(consumers)])
+        return sum(counts)
+    
+    async def start_listening(self) -> bool:
+        """Wake on Postgres NOTIFY for new messages; False means plain interval polling"""
+        self._listening = True
+        self._listener = await listen_for_pending_messages(self.wake, self.listener_lost)
+        return self._listener is not None
+    
+    def listener_lost(self):
+        """The LISTEN connection dropped: poll at the normal interval until it reconnects"""
+        if self._listening:
+            logger.warning("⚠️ Lost the NOTIFY listener connection; reconnecting on the next cycle")
+        self._listener = None
+        # Notifications may have been missed, so check right away
+        self.wake()
+    
+    async def stop_listening(self):
+        """Close the NOTIFY listener connection"""
+        self._listening = False
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+    
+    async def aclose(self):
+        """Close the listener, the pooled HTTP client and the async DB pool before the loop goes away"""
+        await self.stop_listening()
+        await self._http.aclose()
+        await async_engine.dispose()
+    
+    async def run_once(self) -> int:
+        """Process the pending backlog once, then release every connection"""
+        try:
+            return await self.process_pending_messages()
+        finally:
+            await self.aclose()
+    
+    def wake(self):
+        """End the current wait_for_pending_messages early"""
+        self._wakeup.set()
+    
+    async def wait_for_pending_messages(self, interval_seconds: float):
+        """Wait until new messages are committed (or the fallback poll elapses), or sleep interval_seconds if not listening"""
+        if self._listening and self._listener is None:
+            # Reconnect a listener that dropped (or never connected); failure keeps interval polling
+            await self.start_listening()
+        timeout = PENDING_POLL_FALLBACK_SECONDS if self._listener is not None else interval_seconds
+        logger.debug("Next poll in %ss", timeout)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
     
-    def run_continuous_processing(self, interval_seconds: int = 30):
-        """Run continuous processing with specified interval"""
-        print(f"🔄 Starting continuous processing (interval: {interval_seconds}s)")
+    async def run_continuous_processing(self, interval_seconds: int = 30):
+        """Run continuous processing, woken by new messages or every interval_seconds without LISTEN"""
+        logger.info("🔄 Starting continuous processing (interval: %ss)", interval_seconds)
+        await self.start_listening()
         
         try:
             while True:
-                print(f"\n⏰ Checking for pending messages at {datetime.now()}")
+                logger.info("⏰ Checking for pending messages at %s", datetime.now())
                 
-                processed_count = self.process_pending_messages()
+                processed_count = await self.process_pending_messages()
                 
                 if processed_count > 0:
-                    print(f"✅ Processed {processed_count} messages")
+                    logger.info("✅ Processed %s messages", processed_count)
                 else:
-                    print(f"😴 No messages to process, sleeping...")
+                    logger.info("😴 No messages to process, sleeping...")
                 
-                time.sleep(interval_seconds)
+                await self.wait_for_pending_messages(interval_seconds)
                 
-        except KeyboardInterrupt:
-            print(f"\n🛑 Continuous processing stopped")
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            logger.info("🛑 Continuous processing stopped")
+        finally:
+            await self.stop_listening()
 
 def main():
     """Main function"""
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    init_db()
     processor = MessageProcessor()
     
     # Check if API is available
     try:
-        response = requests.get(f"{API_BASE_URL}/health")
+        response = httpx.get(f"{API_BASE_URL}/health")
         if response.status_code == 200:
             print(f"✅ API is available")
         else:
@@ -301,7 +397,7 @@ def main():
         return
     
     # Process pending messages
-    processed_count = processor.process_pending_messages()
+    processed_count = asyncio.run(processor.run_once())
     print(f"\n🎉 Processing completed! Total messages processed: {processed_count}")
 
 if __name__ == "__main__":
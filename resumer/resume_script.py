@@ -5,21 +5,38 @@ Resume script to test human-in-the-loop workflow
 
 import sys
 import os
-import requests
 import json
+import asyncio
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import orjson
+from cachetools import cached, TTLCache
 
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from db.db import get_messages_needing_human_response, get_message_by_id, update_slack_response_status
+from db.db import (
+    get_messages_needing_human_response,
+    get_message_by_id,
+    update_slack_response_status,
+    update_slack_response_status_async
+)
+from api.client import post_json, JSON_HEADERS, API_TIMEOUT
 from dotenv import load_dotenv
 
 load_dotenv()
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8002")
+RESUME_BATCH_CONCURRENCY = int(os.getenv("RESUME_BATCH_CONCURRENCY", "20"))
 
+# Success-path status writes run in the background; pending ones are flushed on exit
+_writer = ThreadPoolExecutor(max_workers=2)
+atexit.register(_writer.shutdown, wait=True)
+
+@cached(TTLCache(maxsize=1, ttl=10))
 def get_messages_for_human_review():
-    """Get messages that need human response"""
+    """Get messages that need human response, reused for 10 seconds across browses"""
     try:
         messages = get_messages_needing_human_response()
         return messages
@@ -27,11 +44,24 @@ def get_messages_for_human_review():
         print(f"❌ Error getting messages for human review: {e}")
         return []
 
-def resume_message_processing(message_id: int, human_feedback: str, slack_response: str):
+def resume_and_send_request(message, human_feedback: str, slack_response: str) -> dict:
+    """Body for /resume_and_send, replying in the message's thread if it has one"""
+    return {
+        "thread_id": message.api_thread_id,
+        "human_feedback": {
+            "feedback": human_feedback,
+            "slack_response": slack_response
+        },
+        "channel": message.channel,
+        "thread_ts": message.thread_ts
+    }
+
+def resume_message_processing(message_id: int, human_feedback: str, slack_response: str, message=None):
     """Resume processing for a specific message with human feedback"""
     try:
-        # Get message from database
-        message = get_message_by_id(message_id)
+        # Get message from database unless the caller already loaded it
+        if message is None:
+            message = get_message_by_id(message_id)
         if not message:
             print(f"❌ Message {message_id} not found")
             return False
@@ -46,64 +76,120 @@ def resume_message_processing(message_id: int, human_feedback: str, slack_respon
         print(f"   Human Feedback: {human_feedback}")
         print(f"   Slack Response: {slack_response}")
         
-        # Prepare resume request
-        resume_request = {
-            "thread_id": message.api_thread_id,
-            "human_feedback": {
-                "feedback": human_feedback,
-                "slack_response": slack_response
-            }
-        }
+        # Resume the workflow and post the Slack response in one round trip
+        request = resume_and_send_request(message, human_feedback, slack_response)
         
-        # Call resume API
         print(f"📡 Calling resume API...")
-        response = requests.post(f"{API_BASE_URL}/resume", json=resume_request)
+        response = post_json(f"{API_BASE_URL}/resume_and_send", request)
         
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ Resume successful!")
-            print(f"   Status: {result.get('status')}")
-            print(f"   Events: {len(result.get('events', []))}")
-            
-            # Send the human's Slack response to Slack
-            if slack_response:
-                print(f"📤 Sending human's Slack response to Slack...")
-                slack_request = {
-                    "channel": message.channel,
-                    "message": slack_response
-                }
-                
-                # Add thread_ts if it exists
-                if message.thread_ts:
-                    slack_request["thread_ts"] = message.thread_ts
-                
-                slack_response_api = requests.post(f"{API_BASE_URL}/send_slack_response", json=slack_request)
-                
-                if slack_response_api.status_code == 200:
-                    print(f"✅ Slack response sent successfully!")
-                    # Update Slack response status
-                    update_slack_response_status(message_id, "yes")
-                else:
-                    print(f"❌ Failed to send Slack response: {slack_response_api.status_code}")
-                    print(f"   Response: {slack_response_api.text}")
-                    # Update Slack response status as failed
-                    update_slack_response_status(message_id, "failed")
-                    return False
-            else:
-                print(f"⚠️ No Slack response provided, skipping Slack send")
-                # Update Slack response status
-                update_slack_response_status(message_id, "yes")
-            
-            return True
-        else:
+        if response.status_code != 200:
             print(f"❌ Resume failed: {response.status_code}")
             print(f"   Response: {response.text}")
             return False
+        
+        result = orjson.loads(response.content)
+        if "error" in result:
+            print(f"❌ Resume failed: {result['error']}")
+            return False
+        print(f"✅ Resume successful!")
+        # This message no longer needs review
+        get_messages_for_human_review.cache_clear()
+        print(f"   Status: {result.get('status')}")
+        print(f"   Events: {len(result.get('events', []))}")
+        
+        slack_status = result.get("slack_status")
+        if slack_status == "error":
+            print(f"❌ Failed to send Slack response")
+            # Update Slack response status as failed
+            update_slack_response_status(message_id, "failed")
+            return False
+        
+        if slack_status == "success":
+            print(f"✅ Slack response sent successfully!")
+        else:
+            print(f"⚠️ No Slack response provided, skipping Slack send")
+        # Update Slack response status
+        _writer.submit(update_slack_response_status, message_id, "yes")
+        
+        return True
             
     except Exception as e:
         print(f"❌ Error resuming message: {e}")
         return False
 
+async def resume_message_async(client: httpx.AsyncClient, message, human_feedback: str, slack_response: str):
+    """Async counterpart of resume_message_processing for an already loaded message"""
+    try:
+        if not message.api_thread_id:
+            print(f"❌ Message {message.id} has no thread_id")
+            return False
+        
+        response = await client.post(
+            f"{API_BASE_URL}/resume_and_send",
+            content=orjson.dumps(resume_and_send_request(message, human_feedback, slack_response)),
+            headers=JSON_HEADERS
+        )
+        if response.status_code != 200:
+            print(f"❌ Resume failed for message {message.id}: {response.status_code}")
+            return False
+        
+        result = orjson.loads(response.content)
+        if "error" in result:
+            print(f"❌ Resume failed for message {message.id}: {result['error']}")
+            return False
+        print(f"✅ Resumed message {message.id} ({len(result.get('events', []))} events)")
+        
+        if result.get("slack_status") == "error":
+            print(f"❌ Failed to send Slack response for message {message.id}")
+            await update_slack_response_status_async(message.id, "failed")
+            return False
+        
+        await update_slack_response_status_async(message.id, "yes")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error resuming message {message.id}: {e}")
+        return False
+
+async def resume_batch(items):
+    """Resume (message, feedback, slack_response) items concurrently over one pooled client"""
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(API_TIMEOUT[1], connect=API_TIMEOUT[0]),
+        limits=httpx.Limits(max_connections=RESUME_BATCH_CONCURRENCY, max_keepalive_connections=10),
+    ) as client:
+        return await asyncio.gather(*(
+            resume_message_async(client, message, feedback, slack_response)
+            for message, feedback, slack_response in items
+        ))
+
+def batch_resume(feedback_file: str):
+    """Resume every pending message listed in a {message_id: {feedback, slack_response}} JSON file"""
+    print("🤖 Batch Resume Workflow")
+    print("=" * 50)
+    
+    try:
+        with open(feedback_file) as f:
+            feedback_by_id = json.load(f)
+    except Exception as e:
+        print(f"❌ Error reading feedback file: {e}")
+        return
+    
+    items = []
+    for message in get_messages_for_human_review():
+        entry = feedback_by_id.get(str(message.id))
+        if entry:
+            items.append((message, entry.get("feedback", ""), entry.get("slack_response", "")))
+    
+    if not items:
+        print("✅ No pending messages matched the feedback file")
+        return
+    
+    print(f"📡 Resuming {len(items)} messages...")
+    results = asyncio.run(resume_batch(items))
+    if any(results):
+        get_messages_for_human_review.cache_clear()
+    print(f"🎉 Resumed {sum(results)}/{len(items)} messages")
+
 def interactive_resume():
     """Interactive resume workflow"""
     print("🤖 Human-in-the-Loop Resume Workflow")
@@ -145,7 +231,8 @@ def interactive_resume():
         success = resume_message_processing(
             selected_message.id, 
             human_feedback, 
-            slack_response
+            slack_response,
+            message=selected_message
         )
         
         if success:
@@ -187,14 +274,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Resume human-in-the-loop workflow")
     parser.add_argument("--interactive", action="store_true", help="Run interactive mode")
     parser.add_argument("--test", action="store_true", help="Run test mode")
+    parser.add_argument("--batch", metavar="FEEDBACK_JSON", help="Resume all pending messages listed in a JSON file")
     
     args = parser.parse_args()
     
-    if args.interactive:
+    if args.batch:
+        batch_resume(args.batch)
+    elif args.interactive:
         interactive_resume()
     elif args.test:
         test_resume_with_sample_data()
     else:
         print("Usage:")
         print("  python resume_script.py --interactive  # Interactive mode")
-        print("  python resume_script.py --test         # Test mode") 
\ No newline at end of file
+        print("  python resume_script.py --test         # Test mode")
+        print("  python resume_script.py --batch FILE   # Batch mode") 
\ No newline at end of file
@@ -10,9 +10,9 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Now import and run the API
-from api.api import app
-import uvicorn
+from api.api import run_server
 
 if __name__ == "__main__":
     print("🚀 Starting API server...")
-    uvicorn.run(app, host="0.0.0.0", port=8002) 
\ No newline at end of file
+    # uvloop/httptools with multiple workers (see api.api.run_server)
+    run_server() 
\ No newline at end of file
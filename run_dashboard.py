@@ -8,6 +8,25 @@ import sys
 import os
 from pathlib import Path
 
+STREAMLIT_FLAGS = {"server_port": 8501, "server_address": "0.0.0.0"}
+
+def run_streamlit(dashboard_path: Path):
+    """Serve the dashboard from this interpreter, falling back to a streamlit subprocess"""
+    try:
+        from streamlit.web import bootstrap
+    except ImportError:
+        subprocess.run([
+            sys.executable, "-m", "streamlit", "run", 
+            str(dashboard_path),
+            "--server.port", str(STREAMLIT_FLAGS["server_port"]),
+            "--server.address", STREAMLIT_FLAGS["server_address"]
+        ])
+        return
+    
+    # Same steps as `streamlit run`, minus the second interpreter start-up
+    bootstrap.load_config_options(flag_options=STREAMLIT_FLAGS)
+    bootstrap.run(str(dashboard_path), False, [], STREAMLIT_FLAGS)
+
 def main():
     # Get the directory where this script is located
     script_dir = Path(__file__).parent
@@ -25,13 +44,7 @@ def main():
     print("-" * 50)
     
     try:
-        # Run streamlit
-        subprocess.run([
-            sys.executable, "-m", "streamlit", "run", 
-            str(dashboard_path),
-            "--server.port", "8501",
-            "--server.address", "0.0.0.0"
-        ])
+        run_streamlit(dashboard_path)
     except KeyboardInterrupt:
         print("\n🛑 Dashboard stopped by user")
     except Exception as e:
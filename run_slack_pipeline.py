@@ -5,19 +5,15 @@ Run script for the Slack pipeline
 
 import sys
 import os
+import logging
 
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Now import and run the Slack pipeline
-from slack_pipeline.slack_pipeline import socket_client
+from slack_pipeline.slack_pipeline import run_pipeline
 
 if __name__ == "__main__":
     print("🤖 Starting Slack pipeline...")
-    socket_client.connect()
-    try:
-        while True:
-            import time
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n🛑 Slack pipeline stopped") 
\ No newline at end of file
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    run_pipeline()
@@ -1,12 +1,20 @@
 import os
+import ssl
+import logging
 from slack_sdk.socket_mode import SocketModeClient
 from slack_sdk.web import WebClient
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
 from slack_sdk.socket_mode.request import SocketModeRequest
 from slack_sdk.socket_mode.response import SocketModeResponse
 from dotenv import load_dotenv
 import time
+import queue
+import signal
+import threading
+import atexit
+from cachetools import TTLCache
 from datetime import datetime
-from db.db import save_message_to_db, DATABASE_URL
+from db.db import init_db, save_messages_bulk, save_message_to_db, DATABASE_URL
 
 load_dotenv()
 
@@ -14,10 +22,22 @@ load_dotenv()
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
 
+# Batched DB writes: flush every MESSAGE_FLUSH_INTERVAL seconds or MESSAGE_FLUSH_SIZE messages
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", "0.2"))
+MESSAGE_FLUSH_SIZE = int(os.getenv("MESSAGE_FLUSH_SIZE", "1000"))
+# Failed batches are retried, then saved row by row, then requeued up to MESSAGE_MAX_SAVE_ATTEMPTS times
+MESSAGE_FLUSH_RETRIES = int(os.getenv("MESSAGE_FLUSH_RETRIES", "3"))
+MESSAGE_RETRY_DELAY = float(os.getenv("MESSAGE_RETRY_DELAY", "0.5"))
+MESSAGE_MAX_SAVE_ATTEMPTS = int(os.getenv("MESSAGE_MAX_SAVE_ATTEMPTS", "5"))
+MESSAGE_WRITER_JOIN_TIMEOUT = float(os.getenv("MESSAGE_WRITER_JOIN_TIMEOUT", "30"))
+
 # --------------------------
 #  Initialize Clients
 # --------------------------
-web_client = WebClient(token=SLACK_BOT_TOKEN)
+# One SSL context for every Web API call (urllib otherwise rebuilds it and reloads
+# the CA bundle per request), and back off on rate limits instead of failing
+web_client = WebClient(token=SLACK_BOT_TOKEN, ssl=ssl.create_default_context())
+web_client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=2))
 socket_client = SocketModeClient(app_token=SLACK_APP_TOKEN, web_client=web_client)
 
 # Get bot's own user ID to avoid responding to itself
@@ -33,36 +53,130 @@ except Exception as e:
 API_START_TIME = time.time()
 print(f"🚀 Pipeline started at: {datetime.fromtimestamp(API_START_TIME)}")
 
-# Track processed messages to prevent duplicates
-PROCESSED_MESSAGES = set()
+# Event filters, precomputed once
+CHANNEL_ALLOWLIST = frozenset({"C09A2NZNEBS"})
+SKIP_PREFIXES = ("[BOT_RESPONSE]", "@Narayan")
+# 5 second buffer to handle socket mode delays
+MIN_MESSAGE_TS = API_START_TIME - 5
+MAX_MESSAGE_AGE_SECONDS = 3600
+
+# Track recently processed messages to prevent duplicates (bounded; Slack retries arrive within minutes)
+PROCESSED_MESSAGES = TTLCache(maxsize=50000, ttl=3600)
+# Socket Mode dispatches listeners from several threads
+PROCESSED_MESSAGES_LOCK = threading.Lock()
+
+# Messages waiting to be written to the database
+message_queue = queue.Queue()
+writer_stop = threading.Event()
+writer_thread = None
+# Save attempts per (channel, ts) for rows that failed and were requeued
+FAILED_SAVE_ATTEMPTS = {}
+
+def flush_messages(rows: list[dict]) -> list[dict]:
+    """Write a batch of captured messages to the database; return the rows that couldn't be saved"""
+    if not rows:
+        return []
+    for attempt in range(MESSAGE_FLUSH_RETRIES):
+        inserted = save_messages_bulk(rows)
+        if inserted is not None:
+            print(f"📩 {inserted} messages captured and saved to database!")
+            return []
+        time.sleep(MESSAGE_RETRY_DELAY * 2 ** attempt)
+    
+    # One bad row fails the whole bulk insert, so save the rest one at a time
+    print(f"❌ Failed to bulk save {len(rows)} messages, saving them one by one")
+    return [row for row in rows if save_message_to_db(**row) is None]
+
+def requeue_failed_messages(rows: list[dict]):
+    """Put unsaved rows back on the queue, dropping (and logging) those out of attempts"""
+    for row in rows:
+        message_key = (row["channel"], row["ts"])
+        attempts = FAILED_SAVE_ATTEMPTS.get(message_key, 0) + 1
+        if attempts >= MESSAGE_MAX_SAVE_ATTEMPTS:
+            FAILED_SAVE_ATTEMPTS.pop(message_key, None)
+            print(f"❌ Dropping message after {attempts} failed saves: {row}")
+            continue
+        FAILED_SAVE_ATTEMPTS[message_key] = attempts
+        message_queue.put(row)
+
+def message_writer():
+    """Drain message_queue into the database in batches until stopped, then flush what's left"""
+    while not writer_stop.is_set() or not message_queue.empty():
+        try:
+            rows = [message_queue.get(timeout=MESSAGE_FLUSH_INTERVAL)]
+        except queue.Empty:
+            continue
+        deadline = time.monotonic() + MESSAGE_FLUSH_INTERVAL
+        while len(rows) < MESSAGE_FLUSH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(message_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        failed = flush_messages(rows)
+        if FAILED_SAVE_ATTEMPTS:
+            # Forget the attempt counts of requeued rows that have now been saved
+            failed_keys = {(row["channel"], row["ts"]) for row in failed}
+            for row in rows:
+                message_key = (row["channel"], row["ts"])
+                if message_key not in failed_keys:
+                    FAILED_SAVE_ATTEMPTS.pop(message_key, None)
+        if not failed:
+            continue
+        if writer_stop.is_set():
+            # Nothing will retry them after shutdown; keep them in the log
+            for row in failed:
+                print(f"❌ Dropping unsaved message at shutdown: {row}")
+        else:
+            requeue_failed_messages(failed)
+            writer_stop.wait(MESSAGE_RETRY_DELAY)
+
+def start_message_writer():
+    """Start the batched DB writer and make sure it drains before the process exits"""
+    global writer_thread
+    writer_thread = threading.Thread(target=message_writer, name="message-writer", daemon=True)
+    writer_thread.start()
+    atexit.register(stop_message_writer)
+
+def stop_message_writer():
+    """Stop the writer and wait for it to flush its in-flight batch and the queue"""
+    writer_stop.set()
+    if writer_thread is not None:
+        writer_thread.join(timeout=MESSAGE_WRITER_JOIN_TIMEOUT)
+        if writer_thread.is_alive():
+            print(f"⚠️ Message writer still busy, {message_queue.qsize()} messages left unsaved")
 
 def capture_message_for_processing(envelope_id: str, channel: str, user: str, text: str, ts: str, thread_ts: str = None):
     """Capture message and save to database"""
     
-    # Create unique message identifier
-    message_key = f"{channel}:{ts}:{user}:{text}"
+    # Slack's ts is unique per message within a channel
+    message_key = (channel, ts)
     
     print(f"🔄 Message key: {message_key}")
     
-    # Check if message was already processed
-    if message_key in PROCESSED_MESSAGES:
-        print(f"🔄 Skipping duplicate message: {message_key}")
-        return
+    # Check if message was already processed, and mark it in the same critical section
+    with PROCESSED_MESSAGES_LOCK:
+        if message_key in PROCESSED_MESSAGES:
+            print(f"🔄 Skipping duplicate message: {message_key}")
+            return
+        PROCESSED_MESSAGES[message_key] = True
     
-    # Add to processed set
-    PROCESSED_MESSAGES.add(message_key)
+    # Queue for the batched database writer
+    message_queue.put({
+        "envelope_id": envelope_id,
+        "channel": channel,
+        "user": user,
+        "text": text,
+        "ts": ts,
+        "thread_ts": thread_ts,
+    })
     
-    # Save to database using the imported function
-    message_id = save_message_to_db(envelope_id, channel, user, text, ts, thread_ts)
-    
-    if message_id:
-        print(f"📩 Message captured and saved to database!")
-        print(f"   Message ID: {message_id}")
-        print(f"   Channel: {channel}")
-        print(f"   User: {user}")
-        print(f"   Text: {text[:50]}...")
-    else:
-        print(f"❌ Failed to save message to database")
+    print(f"📩 Message captured and queued for database!")
+    print(f"   Channel: {channel}")
+    print(f"   User: {user}")
+    print(f"   Text: {text[:50]}...")
 
 # --------------------------
 #  Message Event Handler
@@ -70,60 +184,49 @@ def capture_message_for_processing(envelope_id: str, channel: str, user: str, te
 def process(client: SocketModeClient, req: SocketModeRequest):
     try:
         if req.type == "events_api":
+            # Acknowledge the event first so Slack doesn't retry while we filter and queue it
+            response = SocketModeResponse(envelope_id=req.envelope_id)
+            client.send_socket_mode_response(response)
+            
             event = req.payload["event"]
-            print(f"🔄 Received event: {event}")
             # Handle normal messages (no subtype means not a bot/system message)
             if event.get("type") == "message" and "subtype" not in event:
-                channel = event["channel"]
+                # Cheapest, most selective filters first: other channels, then the bot itself
+                channel = event.get("channel")
+                if channel not in CHANNEL_ALLOWLIST:
+                    return
+                
                 user = event.get("user", "")
+                # Skip messages from the bot itself to prevent infinite loops
+                if BOT_USER_ID and user == BOT_USER_ID:
+                    print(f"🔄 Skipping bot's own message")
+                    return
+                
+                print(f"🔄 Received event: {event}")
                 text = event.get("text", "")
                 ts = event.get("ts", "")
                 thread_ts = event.get("thread_ts", None)
                 envelope_id = req.envelope_id
 
-                print(f"🔄 Received event: {event}")
                 print(f"📊 Message details: user={user}, text='{text}', ts={ts}")
                 
-                # Skip messages from the bot itself to prevent infinite loops
-                if BOT_USER_ID and user == BOT_USER_ID:
-                    print(f"🔄 Skipping bot's own message")
-                    return
-                
-                # Skip messages that start with bot identifier to prevent infinite loops
-                if text.startswith("[BOT_RESPONSE]"):
-                    print(f"🔄 Skipping bot response message: {text[:50]}...")
-                    return
-                
-                # Skip messages that start with @Narayan (bot messages)
-                if text.startswith("@Narayan"):
-                    print(f"🔄 Skipping @Narayan message: {text[:50]}...")
+                # Skip bot responses and @Narayan (bot) messages to prevent infinite loops
+                if text.startswith(SKIP_PREFIXES):
+                    print(f"🔄 Skipping bot message: {text[:50]}...")
                     return
                     
-                # Skip messages older than API start time (with buffer for socket mode unpredictability)
+                # Skip messages from before the pipeline started or more than an hour old
                 message_time = float(ts)
-                current_time = time.time()
-                
-                # Add 5 second buffer to handle socket mode delays
-                if message_time < (API_START_TIME - 5):
-                    print(f"⏰ Skipping old message (ts={ts}, message_time={message_time}, API started at {API_START_TIME})")
-                    return
-                
-                # Also skip messages that are too old (more than 1 hour old)
-                if message_time < (current_time - 3600):
-                    print(f"⏰ Skipping very old message (ts={ts}, message_time={message_time}, current_time={current_time})")
+                if message_time < max(MIN_MESSAGE_TS, time.time() - MAX_MESSAGE_AGE_SECONDS):
+                    print(f"⏰ Skipping old message (ts={ts}, API started at {API_START_TIME})")
                     return
                     
-                if channel == "C09A2NZNEBS":
-                    print(f"📩 Received from {user} in {channel}: {text}")
-                    print(f"📋 Message details: ts={ts}, thread_ts={thread_ts}")
-
-                    # Capture message for processing (no immediate response)
-                    print(f"🔄 WILL SAVE TO DB NOW")
-                    capture_message_for_processing(envelope_id, channel, user, text, ts, thread_ts)
+                print(f"📩 Received from {user} in {channel}: {text}")
+                print(f"📋 Message details: ts={ts}, thread_ts={thread_ts}")
 
-            # Acknowledge the event so Slack doesn't retry
-            response = SocketModeResponse(envelope_id=req.envelope_id)
-            client.send_socket_mode_response(response)
+                # Capture message for processing (no immediate response)
+                print(f"🔄 WILL SAVE TO DB NOW")
+                capture_message_for_processing(envelope_id, channel, user, text, ts, thread_ts)
     except Exception as e:  
         print(f"❌ Error processing event: {e}")
 
@@ -132,14 +235,28 @@ def process(client: SocketModeClient, req: SocketModeRequest):
 # --------------------------
 socket_client.socket_mode_request_listeners.append(process)
 
-if __name__ == "__main__":
+def wait_for_shutdown():
+    """Block the main thread until SIGINT/SIGTERM instead of polling with sleep"""
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        # Fallback for platforms where the handler doesn't interrupt the wait
+        pass
+
+def run_pipeline():
+    """Start the DB writer, connect to Socket Mode and run until signalled"""
+    init_db()
     print("🤖 Slack Pipeline is running via Socket Mode...")
     print(f"🗄️  Database: {DATABASE_URL}")
     print("📝 Pipeline will capture messages and save to PostgreSQL")
+    start_message_writer()
     socket_client.connect()
-    # Keep the script running
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n�� Pipeline stopped") 
\ No newline at end of file
+    wait_for_shutdown()
+    print("\n🛑 Pipeline stopped")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    run_pipeline()
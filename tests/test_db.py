@@ -0,0 +1,102 @@
+"""
+DB-free checks for the status encoding and graph-event parsing in db.db
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the repo root to Python path, as the run_*.py scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+from db.db import (
+    SmallEnum,
+    ProcessedStatus,
+    PROCESSED_STATUSES,
+    ParsedEvents,
+    EVENT_HANDLERS,
+    parse_events,
+)
+
+def baseline_parse_events(events: list) -> dict:
+    """The if/elif extractor parse_events replaced, kept as the reference behaviour"""
+    parsed = {"classification": None, "reasoning": None, "notification_message": None}
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        if 'classify_message' in event:
+            classify_data = event['classify_message']
+            if isinstance(classify_data, dict):
+                parsed["classification"] = classify_data.get('classification')
+                parsed["reasoning"] = classify_data.get('reasoning')
+        elif 'decision_maker' in event:
+            decision_data = event['decision_maker']
+            if isinstance(decision_data, dict) and parsed["classification"] is None:
+                parsed["classification"] = decision_data.get('classification')
+        elif 'ai_notification' in event:
+            notification_data = event['ai_notification']
+            if isinstance(notification_data, dict):
+                parsed["notification_message"] = notification_data.get('notification_message')
+    return parsed
+
+def as_dict(parsed: ParsedEvents) -> dict:
+    return {field: getattr(parsed, field) for field in ParsedEvents.__slots__}
+
+def test_small_enum_round_trip():
+    enum = SmallEnum(("no", "yes", "failed"))
+    for code, value in enumerate(enum.values):
+        assert enum.process_bind_param(value, None) == code
+        assert enum.process_result_value(code, None) == value
+        assert enum.code(value) == code
+    assert enum.process_bind_param(None, None) is None
+    assert enum.process_result_value(None, None) is None
+
+def test_small_enum_rejects_unknown_value():
+    with pytest.raises(ValueError):
+        ProcessedStatus.process_bind_param("not_a_status", None)
+
+def test_processed_status_codes_are_append_only():
+    # Stored codes are tuple positions; reordering would change the meaning of existing rows
+    assert PROCESSED_STATUSES[:3] == ("pending", "processed", "processed_ignore")
+    assert ProcessedStatus.code("in_progress") == len(PROCESSED_STATUSES) - 1
+
+EVENT_CASES = {
+    "notify": [
+        {"process_message": None},
+        {"classify_message": {"classification": "notify", "reasoning": "FYI"}},
+        {"decision_maker": {"classification": "notify"}},
+        {"ai_notification": {"notification_message": "Heads up"}},
+        {"end": {}},
+    ],
+    "respond_interrupted": [
+        {"classify_message": {"classification": "respond", "reasoning": "Needs a human"}},
+        {"decision_maker": {"classification": "respond"}},
+        {"__interrupt__": [{"value": "Please provide feedback:"}]},
+    ],
+    "decision_only": [
+        {"decision_maker": {"classification": "ignore"}},
+    ],
+    "decision_does_not_override_classify": [
+        {"classify_message": {"classification": "respond", "reasoning": "r"}},
+        {"decision_maker": {"classification": "ignore"}},
+    ],
+    "malformed": [
+        "not an event",
+        None,
+        {"classify_message": "not a dict"},
+        {"ai_notification": None},
+    ],
+    "empty": [],
+}
+
+@pytest.mark.parametrize("name", EVENT_CASES)
+def test_parse_events_matches_baseline(name):
+    events = EVENT_CASES[name]
+    assert as_dict(parse_events(events)) == baseline_parse_events(events)
+
+def test_event_handlers_cover_the_extracted_nodes():
+    assert set(EVENT_HANDLERS) == {"classify_message", "decision_maker", "ai_notification"}
@@ -0,0 +1,50 @@
+"""
+Pure helpers in agent_graph.graph (no LLM calls are made)
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the repo root to Python path, as the run_*.py scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="module")
+def graph_module():
+    for dependency in ("langgraph", "langchain", "numpy", "orjson", "httpx"):
+        pytest.importorskip(dependency)
+    # Model clients are constructed at import; they need a key but make no request
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from agent_graph import graph
+    return graph
+
+def test_parse_message_splits_channel_user_text(graph_module):
+    parsed = graph_module.parse_message("C09A2NZNEBS|U0999D7H9M0|Can you sign the RR?")
+    assert parsed == ("C09A2NZNEBS", "U0999D7H9M0", "Can you sign the RR?")
+    assert (parsed.channel, parsed.author, parsed.message) == parsed
+
+def test_parse_message_keeps_pipes_in_text(graph_module):
+    parsed = graph_module.parse_message("C1|U1|a | b || c")
+    assert parsed.message == "a | b || c"
+
+def test_parse_message_tolerates_missing_fields(graph_module):
+    assert graph_module.parse_message("C1|U1|") == ("C1", "U1", "")
+    assert graph_module.parse_message("C1") == ("C1", "", "")
+
+def test_redis_cached_classification_unpacks_into_state(graph_module, monkeypatch):
+    class FakeRedis(dict):
+        def set(self, key, value, ex=None):
+            self[key] = value
+
+    monkeypatch.setattr(graph_module.classification_cache, "_redis", FakeRedis())
+    monkeypatch.setattr(graph_module, "semantic_cache", None)
+
+    cache_key = graph_module.make_cache_key("C1", graph_module.normalize_message("Thanks!"))
+    graph_module.store_classification("C1", cache_key, None, "ignore", "Just thanks")
+
+    # Redis hands JSON back, so the stored tuple arrives as a list
+    channel, author, message, known, _, _ = graph_module.prepare_classification({"input": "C1|U1|Thanks!"})
+    assert known == ["ignore", "Just thanks"]
+    update = graph_module.classification_update(channel, author, message, *known)
+    assert (update["classification"], update["reasoning"]) == ("ignore", "Just thanks")
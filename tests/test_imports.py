@@ -0,0 +1,45 @@
+"""
+Import smoke tests: every entry module must at least import without a database
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the repo root to Python path, as the run_*.py scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_db_module_imports():
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("asyncpg")
+    from sqlalchemy.dialects import postgresql
+    from db import db
+
+    # Module-level statements are built at import; compiling them catches broken references
+    for stmt in (
+        db.pending_messages_query,
+        db.pending_messages_batch_query,
+        db.claim_pending_messages_stmt,
+        db.update_message_status_stmt,
+    ):
+        stmt.compile(dialect=postgresql.dialect())
+
+LOCAL_PACKAGES = {"agent_graph", "api", "db", "message_processor", "resumer", "slack_pipeline", "ui"}
+
+@pytest.mark.parametrize("module", [
+    "api.ndjson",
+    "api.client",
+    "agent_graph.llm_cache",
+    "resumer.resume_script",
+    "message_processor.message_processor",
+])
+def test_module_imports(module):
+    import importlib
+    try:
+        importlib.import_module(module)
+    except ModuleNotFoundError as e:
+        # Only a missing third-party dependency is a skip; a missing local module is a failure
+        if e.name.split(".")[0] in LOCAL_PACKAGES:
+            raise
+        pytest.skip(f"{e.name} is not installed")
@@ -0,0 +1,125 @@
+"""
+Exact-match and semantic LLM result caches
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the repo root to Python path, as the run_*.py scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from agent_graph.llm_cache import LLMResponseCache, SemanticCache, make_cache_key, normalize_message
+
+class FakeRedis:
+    """Just the get/set surface LLMResponseCache uses, storing bytes like redis-py"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value.encode() if isinstance(value, str) else value
+
+class FakeEmbeddings:
+    """Maps known texts to fixed vectors, like an embeddings client's embed_query"""
+
+    def __init__(self, vectors: dict):
+        self.vectors = vectors
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self.vectors[text]
+
+def memory_cache(maxsize):
+    cache = LLMResponseCache("test", maxsize=maxsize)
+    cache._redis = None
+    return cache
+
+def test_lru_evicts_least_recently_set():
+    cache = memory_cache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == (2, 3)
+
+def test_lru_hit_moves_entry_to_end():
+    cache = memory_cache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now the most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+def test_lru_overwrite_refreshes_entry():
+    cache = memory_cache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 10)
+    cache.set("c", 3)
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+def test_redis_round_trip_returns_unpackable_list():
+    cache = LLMResponseCache("classify_message")
+    cache._redis = FakeRedis()
+    cache.set("key", ("notify", "FYI"))
+    assert "classify_message:key" in cache._redis.store
+    cached = cache.get("key")
+    # JSON turns the tuple into a list; callers unpack it positionally
+    assert cached == ["notify", "FYI"]
+    classification, reasoning = cached
+    assert (classification, reasoning) == ("notify", "FYI")
+    assert cache.get("missing") is None
+
+def test_cache_key_ignores_case_and_whitespace():
+    assert make_cache_key("C1", normalize_message("  Thanks!\n")) == make_cache_key("C1", normalize_message("thanks!"))
+    assert make_cache_key("C1", "thanks!") != make_cache_key("C2", "thanks!")
+
+UNIT = {name: vector for name, vector in zip("xyz", np.eye(3).tolist())}
+
+def test_semantic_lookup_respects_threshold():
+    cache = SemanticCache(FakeEmbeddings({**UNIT, "xy": [1.0, 1.0, 0.0]}), threshold=0.9, path=None)
+    cache.add(cache.embed("x"), "X", "C1")
+    assert cache.lookup(cache.embed("x"), "C1") == "X"
+    # cos(x, x+y) ~ 0.707, below the threshold
+    assert cache.lookup(cache.embed("xy"), "C1") is None
+
+def test_semantic_lookup_is_per_channel():
+    cache = SemanticCache(FakeEmbeddings(UNIT), threshold=0.9, path=None)
+    cache.add(cache.embed("x"), "X in C1", "C1")
+    assert cache.lookup(cache.embed("x"), "C2") is None
+    cache.add(cache.embed("x"), "X in C2", "C2")
+    assert cache.lookup(cache.embed("x"), "C1") == "X in C1"
+    assert cache.lookup(cache.embed("x"), "C2") == "X in C2"
+
+@pytest.mark.parametrize("maxsize", [1, 2])
+def test_semantic_evicts_oldest(maxsize):
+    cache = SemanticCache(FakeEmbeddings(UNIT), threshold=0.9, maxsize=maxsize, path=None)
+    for name in "xyz":
+        cache.add(cache.embed(name), name.upper(), "C1")
+    assert len(cache) == maxsize
+    kept = [name for name in "xyz" if cache.lookup(cache.embed(name), "C1") is not None]
+    assert kept == list("xyz"[-maxsize:])
+
+def test_semantic_cache_persists_newest_entries(tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    cache = SemanticCache(FakeEmbeddings(UNIT), threshold=0.9, maxsize=3, path=path, save_every=100)
+    for name in "xyz":
+        cache.add(cache.embed(name), name.upper(), "C1")
+    assert not os.path.exists(path)  # below save_every
+    cache.save()
+
+    reloaded = SemanticCache(FakeEmbeddings(UNIT), threshold=0.9, maxsize=2, path=path)
+    assert len(reloaded) == 2
+    assert reloaded.lookup(reloaded.embed("x"), "C1") is None
+    assert reloaded.lookup(reloaded.embed("z"), "C1") == "Z"
+    assert reloaded.lookup(reloaded.embed("z"), "C2") is None
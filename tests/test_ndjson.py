@@ -0,0 +1,65 @@
+"""
+NDJSON framing shared by the streaming endpoints and their clients
+"""
+
+import os
+import sys
+from dataclasses import dataclass
+
+import pytest
+
+# Add the repo root to Python path, as the run_*.py scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("orjson")
+
+from api.ndjson import dumps, encode_line, merge_records, read_ndjson
+
+RECORDS = [
+    {"status": "started", "thread_id": "t-1", "message_id": "m-1"},
+    {"event": {"classify_message": {"classification": "notify"}}},
+    {"event": {"ai_notification": {"notification_message": "Heads up"}}},
+    {"status": "completed"},
+]
+
+def test_merge_records_collects_events_in_order():
+    assert merge_records(RECORDS) == {
+        "status": "completed",
+        "thread_id": "t-1",
+        "message_id": "m-1",
+        "events": [
+            {"classify_message": {"classification": "notify"}},
+            {"ai_notification": {"notification_message": "Heads up"}},
+        ],
+    }
+
+def test_merge_records_keeps_error_from_final_line():
+    result = merge_records([RECORDS[0], {"status": "error", "error": "boom", "thread_id": None}])
+    assert result["status"] == "error"
+    assert result["error"] == "boom"
+    assert result["thread_id"] is None
+    assert result["events"] == []
+
+def test_read_ndjson_round_trips_encoded_lines():
+    payload = b"".join(encode_line(record) for record in RECORDS)
+    # iter_lines() yields the lines without their newline, plus blank keep-alive lines
+    lines = payload.split(b"\n") + [b""]
+    assert read_ndjson(lines) == merge_records(RECORDS)
+
+def test_encode_line_is_one_line_per_record():
+    line = encode_line({"event": {"text": "multi\nline"}})
+    assert line.endswith(b"\n")
+    assert line.count(b"\n") == 1
+
+def test_dumps_falls_back_for_objects_and_int_keys():
+    @dataclass
+    class Point:
+        x: int
+
+    class Opaque:
+        __slots__ = ()
+        def __str__(self):
+            return "opaque"
+
+    assert dumps({1: Point(2)}) == b'{"1":{"x":2}}'
+    assert dumps([Opaque()]) == b'["opaque"]'
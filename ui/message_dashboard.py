@@ -5,8 +5,9 @@ Streamlit Dashboard for Slack Message Management
 
 import streamlit as st
 import pandas as pd
+from sqlalchemy import or_
 from datetime import datetime
-import requests
+from dataclasses import dataclass, fields
 import json
 import sys
 import os
@@ -16,99 +17,181 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db.db import (
     get_messages_needing_human_response, 
-    get_message_by_id, 
     update_slack_response_status,
+    get_message_stats,
     SessionLocal,
     SlackMessage
 )
+import orjson
+from api.client import post_json
 
 # Configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8002")
+PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "50"))
 
-def get_all_messages():
-    """Get all messages from database"""
+@dataclass(frozen=True)
+class MessageSummary:
+    """Plain copy of the columns a message card header needs, safe to cache across reruns"""
+    id: int
+    created_at: datetime
+    channel: str
+    user: str
+    text: str
+    ts: str
+    thread_ts: str
+    classification: str
+    api_thread_id: str
+    slack_responded: str
+
+@dataclass(frozen=True)
+class MessageDetails:
+    """The large text columns, fetched only when a card's details are opened"""
+    reasoning: str
+    notification_message: str
+    slack_response_text: str
+
+MESSAGE_SUMMARY_COLUMNS = [getattr(SlackMessage, field.name) for field in fields(MessageSummary)]
+MESSAGE_DETAILS_COLUMNS = [getattr(SlackMessage, field.name) for field in fields(MessageDetails)]
+
+@st.cache_data(ttl=5, show_spinner=False)
+def get_message_stats_cached():
+    """get_message_stats, memoized briefly so widget interactions don't re-query"""
+    return get_message_stats()
+
+@st.cache_data(ttl=5, show_spinner=False)
+def get_messages_by_classification(classification, status_filter="all", search_term="", limit=PAGE_SIZE, offset=0):
+    """Get one page of messages filtered by classification, status and search text"""
     try:
-        db = SessionLocal()
-        messages = db.query(SlackMessage).order_by(SlackMessage.created_at.desc()).all()
-        return messages
+        with SessionLocal() as db:
+            query = db.query(*MESSAGE_SUMMARY_COLUMNS)
+            if classification != "all":
+                query = query.filter(SlackMessage.classification == classification)
+            
+            if status_filter == "pending":
+                # For pending, exclude ignore messages and only show messages that need responses
+                query = query.filter(
+                    SlackMessage.slack_responded == "no",
+                    or_(SlackMessage.classification.is_(None), SlackMessage.classification != "ignore")
+                )
+            elif status_filter == "responded":
+                query = query.filter(SlackMessage.slack_responded == "yes")
+            elif status_filter == "failed":
+                query = query.filter(SlackMessage.slack_responded == "failed")
+            
+            if search_term:
+                query = query.filter(SlackMessage.text.icontains(search_term, autoescape=True))
+            
+            rows = (
+                query.order_by(SlackMessage.created_at.desc())
+                .limit(limit)
+                .offset(offset)
+                .all()
+            )
+        return [MessageSummary(*row) for row in rows]
     except Exception as e:
-        st.error(f"Error fetching messages: {e}")
+        st.error(f"Error fetching {classification} messages: {e}")
         return []
-    finally:
-        db.close()
 
-def get_messages_by_classification(classification):
-    """Get messages filtered by classification"""
+@st.cache_data(ttl=5, show_spinner=False)
+def get_message_details(message_id):
+    """Get the reasoning, notification and response text for one message"""
     try:
-        db = SessionLocal()
-        if classification == "all":
-            messages = db.query(SlackMessage).order_by(SlackMessage.created_at.desc()).all()
-        else:
-            messages = db.query(SlackMessage).filter(
-                SlackMessage.classification == classification
-            ).order_by(SlackMessage.created_at.desc()).all()
-        return messages
+        with SessionLocal() as db:
+            row = db.query(*MESSAGE_DETAILS_COLUMNS).filter(SlackMessage.id == message_id).first()
+        return MessageDetails(*row) if row else None
     except Exception as e:
-        st.error(f"Error fetching {classification} messages: {e}")
-        return []
-    finally:
-        db.close()
+        st.error(f"Error fetching details for message {message_id}: {e}")
+        return None
 
-def submit_human_feedback(message_id, feedback, slack_response):
+def submit_human_feedback(message, feedback, slack_response):
     """Submit human feedback via resume API"""
     try:
-        # Get message details
-        message = get_message_by_id(message_id)
-        if not message or not message.api_thread_id:
+        # The card already holds the message, so there's nothing to re-fetch
+        if not message.api_thread_id:
             st.error("Message not found or missing thread ID")
             return False
         
-        # Prepare resume request
-        resume_request = {
+        # Resume the workflow and post the Slack response in one round trip
+        request = {
             "thread_id": message.api_thread_id,
             "human_feedback": {
                 "feedback": feedback,
                 "slack_response": slack_response
-            }
+            },
+            "channel": message.channel,
+            "thread_ts": message.ts
         }
         
-        # Call resume API
-        response = requests.post(f"{API_BASE_URL}/resume", json=resume_request)
+        response = post_json(f"{API_BASE_URL}/resume_and_send", request)
         
-        if response.status_code == 200:
-            result = response.json()
-            st.success("Feedback submitted successfully!")
-            
-            # Send Slack response if provided
-            if slack_response:
-                slack_request = {
-                    "channel": message.channel,
-                    "message": slack_response
-                }
-                if message.ts:
-                    slack_request["thread_ts"] = message.ts
-                
-                slack_response_api = requests.post(f"{API_BASE_URL}/send_slack_response", json=slack_request)
-                
-                if slack_response_api.status_code == 200:
-                    st.success("Slack response sent successfully!")
-                    update_slack_response_status(message_id, "yes", slack_response)
-                else:
-                    st.error("Failed to send Slack response")
-                    update_slack_response_status(message_id, "failed")
-                    return False
-            else:
-                update_slack_response_status(message_id, "yes")
-            
-            return True
-        else:
+        if response.status_code != 200:
             st.error(f"Failed to submit feedback: {response.status_code}")
             return False
+        
+        result = orjson.loads(response.content)
+        if "error" in result:
+            st.error(f"Failed to resume workflow: {result['error']}")
+            return False
+        st.success("Feedback submitted successfully!")
+        
+        if result.get("slack_status") == "error":
+            st.error("Failed to send Slack response")
+            update_slack_response_status(message.id, "failed")
+            return False
+        
+        if slack_response:
+            st.success("Slack response sent successfully!")
+        # Written before returning, so the rerun that follows sees the new status
+        if not update_slack_response_status(message.id, "yes", slack_response or None):
+            st.error("Feedback submitted, but the message status could not be saved")
+            return False
+        
+        return True
             
     except Exception as e:
         st.error(f"Error submitting feedback: {e}")
         return False
 
+@st.fragment
+def display_message_details(message):
+    """Reasoning and Slack response details, built only while the card's toggle is on"""
+    # A fragment, so flipping the toggle reruns just this card instead of the whole page
+    if not st.toggle("Show details", key=f"details_{message.id}"):
+        return
+    # Large text columns are only fetched once the card's details are opened
+    details = get_message_details(message.id)
+    
+    # Reasoning (if available)
+    if details and details.reasoning:
+        with st.expander("AI Reasoning", expanded=True):
+            st.markdown(details.reasoning)
+    
+    # Slack response information (for respond and notify messages)
+    if message.classification in ["respond", "notify"]:
+        response_info = []
+        
+        # Show notification message for notify messages
+        if message.classification == "notify" and details and details.notification_message:
+            response_info.append(f"**Notification Sent:** {details.notification_message}")
+        
+        # Show Slack response status and actual response
+        if message.slack_responded == "yes":
+            response_info.append("✅ **Slack Response:** Sent successfully")
+            if details and details.slack_response_text:
+                response_info.append(f"**Response Text:** {details.slack_response_text}")
+        elif message.slack_responded == "failed":
+            response_info.append("❌ **Slack Response:** Failed to send")
+        else:
+            response_info.append("⏳ **Slack Response:** Pending")
+        
+        # Show thread information if available
+        if message.thread_ts:
+            response_info.append(f"**Thread:** {message.thread_ts}")
+        
+        with st.expander("📤 Slack Response Details", expanded=True):
+            for info in response_info:
+                st.markdown(info)
+
 def display_message_card(message, show_feedback_form=False):
     """Display a single message as a card"""
     with st.container():
@@ -149,37 +232,7 @@ def display_message_card(message, show_feedback_form=False):
         # Message text
         st.markdown(f"**Message:** {message.text}")
         
-        # Reasoning (if available)
-        if message.reasoning:
-            with st.expander("AI Reasoning"):
-                st.markdown(message.reasoning)
-        
-        # Slack response information (for respond and notify messages)
-        if message.classification in ["respond", "notify"]:
-            response_info = []
-            
-            # Show notification message for notify messages
-            if message.classification == "notify" and message.notification_message:
-                response_info.append(f"**Notification Sent:** {message.notification_message}")
-            
-            # Show Slack response status and actual response
-            if message.slack_responded == "yes":
-                response_info.append("✅ **Slack Response:** Sent successfully")
-                if message.slack_response_text:
-                    response_info.append(f"**Response Text:** {message.slack_response_text}")
-            elif message.slack_responded == "failed":
-                response_info.append("❌ **Slack Response:** Failed to send")
-            else:
-                response_info.append("⏳ **Slack Response:** Pending")
-            
-            # Show thread information if available
-            if message.thread_ts:
-                response_info.append(f"**Thread:** {message.thread_ts}")
-            
-            if response_info:
-                with st.expander("📤 Slack Response Details"):
-                    for info in response_info:
-                        st.markdown(info)
+        display_message_details(message)
         
         # Feedback form for respond messages
         if show_feedback_form and message.classification == "respond" and message.slack_responded != "yes":
@@ -200,8 +253,9 @@ def display_message_card(message, show_feedback_form=False):
                 with col1:
                     if st.button("Submit Feedback", key=f"submit_{message.id}"):
                         if feedback and slack_response:
-                            success = submit_human_feedback(message.id, feedback, slack_response)
+                            success = submit_human_feedback(message, feedback, slack_response)
                             if success:
+                                st.cache_data.clear()  # Show the updated status
                                 st.rerun()  # Refresh the page
                         else:
                             st.error("Please provide both feedback and Slack response")
@@ -240,38 +294,33 @@ def main():
     # Search filter
     search_term = st.sidebar.text_input("Search messages:", placeholder="Enter text to search...")
     
+    # Pagination
+    page = st.sidebar.number_input("Page", min_value=1, value=1, step=1)
+    
     # Refresh button
     if st.sidebar.button("🔄 Refresh"):
+        st.cache_data.clear()
         st.rerun()
     
     # Get messages based on filters
-    messages = get_messages_by_classification(classification)
-    
-    # Apply additional filters
-    if status_filter != "all":
-        if status_filter == "pending":
-            # For pending, exclude ignore messages and only show messages that need responses
-            messages = [m for m in messages if m.slack_responded == "no" and m.classification != "ignore"]
-        elif status_filter == "responded":
-            messages = [m for m in messages if m.slack_responded == "yes"]
-        elif status_filter == "failed":
-            messages = [m for m in messages if m.slack_responded == "failed"]
-    
-    if search_term:
-        messages = [m for m in messages if search_term.lower() in m.text.lower()]
+    messages = get_messages_by_classification(
+        classification, status_filter, search_term, limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE
+    )
     
     # Display statistics
     col1, col2, col3, col4, col5 = st.columns(5)
     
-    all_messages = get_all_messages()
-    respond_count = len([m for m in all_messages if m.classification == "respond"])
-    notify_count = len([m for m in all_messages if m.classification == "notify"])
-    ignore_count = len([m for m in all_messages if m.classification == "ignore"])
+    # One GROUP BY query: {(classification, slack_responded): count}
+    stats = get_message_stats_cached()
+    total_count = sum(stats.values())
+    respond_count = sum(count for (c, _), count in stats.items() if c == "respond")
+    notify_count = sum(count for (c, _), count in stats.items() if c == "notify")
+    ignore_count = sum(count for (c, _), count in stats.items() if c == "ignore")
     # Count messages that actually needed responses and got them
-    responded_count = len([m for m in all_messages if m.slack_responded == "yes" and m.classification in ["respond", "notify"]])
+    responded_count = stats.get(("respond", "yes"), 0) + stats.get(("notify", "yes"), 0)
     
     with col1:
-        st.metric("Total Messages", len(all_messages))
+        st.metric("Total Messages", total_count)
     with col2:
         st.metric("Respond", respond_count)
     with col3:
@@ -282,7 +331,7 @@ def main():
         st.metric("Responded", responded_count)
     
     # Display messages
-    st.subheader(f"Messages ({len(messages)} found)")
+    st.subheader(f"Messages (page {page}, {len(messages)} shown)")
     
     if not messages:
         st.info("No messages found matching the current filters.")